@@ -1,4 +1,13 @@
+import json
+import math
+import os
+import re
+import shutil
 import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
@@ -6,106 +15,814 @@ import joblib
 import numpy as np
 from datetime import datetime
 
+import metrics
+import training_store
+from file_lock import FileLock
+from time_utils import TIME_PATTERN, format_minutes, parse_time_to_minutes
 
-def load_task_data():
-    """Load task data from the SQLite database"""
-    conn = sqlite3.connect("trainingData.db")
-    df = pd.read_sql_query("SELECT * FROM tasks", conn)
-    conn.close()
+TRAINING_DB = os.environ.get("TRAINING_DB", "trainingData.db")
+MODEL_PATH = "model.pkl"
+# The compact alternative to the forest, see TaskTimeQuantiles
+QUANTILE_MODEL_PATH = "model_quantiles.npy"
+# Training arrays cached between runs by load_task_counts(). Bump the schema version when
+# their layout or meaning changes, older caches are then rebuilt.
+FEATURE_CACHE_PATH = os.environ.get("FEATURE_CACHE_PATH", "training_features.npz")
+FEATURE_SCHEMA_VERSION = 1
+# Where select_model() writes its cross-validation report, and its default time budget
+MODEL_SELECTION_PATH = "model_selection.json"
+MODEL_SELECTION_BUDGET_SECONDS = float(os.environ.get("MODEL_SELECTION_BUDGET_SECONDS", "120"))
+# Which estimator train_model() builds and predictions use: "forest" or "quantiles"
+MODEL_KIND = os.environ.get("MODEL_KIND", "forest")
+ENCODER_PATH = "label_encoder.pkl"
+# Every saved version gets its own MODEL_DIR/v<version> folder holding the model and encoder
+# (named as above); model_meta.json, written last, says which version is current
+MODEL_DIR = "models"
+# Training watermark and bookkeeping for the saved model
+MODEL_META_PATH = "model_meta.json"
+PREDICTIONS_DB = os.environ.get("PREDICTIONS_DB", "predicted_schedule.db")
+# How many generated schedules to keep in PREDICTIONS_DB; older runs are pruned on every save
+PREDICTION_RUN_RETENTION = int(os.environ.get("PREDICTION_RUN_RETENTION", "20"))
+
+# Trees in a freshly built forest, and the size at which incremental updates trigger a rebuild
+BASE_TREES = 100
+MAX_TREES = 300
+# Trees grown per fit() call, so training can report progress while it runs
+FIT_STEP = 10
+# Configurations select_model() cross-validates, roughly cheapest first so a short budget
+# still ranks some of them. Forest params are RandomForestRegressor keyword arguments.
+MODEL_CANDIDATES = [
+    ("quantiles", {}),
+    ("forest", {"n_estimators": 30, "max_depth": 8}),
+    ("forest", {"n_estimators": 30, "min_samples_leaf": 5}),
+    ("forest", {"n_estimators": 60, "max_depth": 12, "min_samples_leaf": 2}),
+    ("forest", {"n_estimators": BASE_TREES}),
+]
+
+MODEL_LOAD_SECONDS = metrics.histogram("model_load_seconds", "Time to load the model and label encoder from disk")
+MODEL_PREDICT_SECONDS = metrics.histogram("model_predict_seconds",
+                                          "Time per predict_times() call, encoding and formatting included")
+MODEL_PREDICTED_TASKS = metrics.counter("model_predicted_tasks_total", "Task names predicted")
+
+
+class TaskTimeQuantiles:
+    """Per-task time-of-day quantiles, a compact alternative to the random forest.
+
+    The forest only ever sees (task, hour) pairs, so what it learns is close to a time
+    distribution per task. This keeps that distribution as a small float32 table, one row
+    per encoded task and one column per QUANTILES entry, and predicts the median. The
+    table is saved as a plain .npy file, which loads in microseconds and can be
+    memory-mapped. fit()/predict() take the same X as the forest; time_hour is ignored.
+    """
+
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self, table=None):
+        self.table_ = table
+
+    def fit(self, X, y, sample_weight=None):
+        codes = np.asarray(X['task_encoded'], dtype=np.int64)
+        minutes = np.asarray(y, dtype="float64")
+        weight = np.ones(len(minutes)) if sample_weight is None else np.asarray(sample_weight, dtype="float64")
+        # Sorted by task, then time, each task's rows are one contiguous run
+        order = np.lexsort((minutes, codes))
+        codes, minutes, cumulative = codes[order], minutes[order], weight[order]
+        n_tasks = int(codes.max()) + 1 if len(codes) else 0
+        bounds = np.searchsorted(codes, np.arange(n_tasks + 1))
+        table = np.full((n_tasks, len(self.QUANTILES)), np.nan, dtype=np.float32)
+        for task in range(n_tasks):
+            start, end = bounds[task], bounds[task + 1]
+            if start == end:
+                continue
+            cumulative[start:end] = np.cumsum(cumulative[start:end])
+            # Weighted quantile: the first time whose cumulative weight reaches q of the total
+            positions = np.searchsorted(cumulative[start:end], np.array(self.QUANTILES) * cumulative[end - 1])
+            table[task] = minutes[start + np.minimum(positions, end - start - 1)]
+        self.table_ = table
+        return self
+
+    def predict(self, X, quantile=0.5):
+        column = self.QUANTILES.index(quantile)
+        return self.table_[np.asarray(X['task_encoded'], dtype=np.int64), column].astype("float64")
+
+    def save(self, path):
+        # A file object, np.save would add .npy to replace_file's temporary name
+        with open(path, "wb") as f:
+            np.save(f, self.table_)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+
+class ForestEstimator:
+    """The original model: a RandomForestRegressor pickled with joblib. Can be grown incrementally."""
+
+    kind = "forest"
+    path = MODEL_PATH
+    incremental = True
+
+    def fit(self, X, y, sample_weight, progress, params=None):
+        # params are RandomForestRegressor keyword arguments, e.g. from MODEL_CANDIDATES
+        params = dict(params or {})
+        n_estimators = params.pop("n_estimators", BASE_TREES)
+        model = RandomForestRegressor(n_estimators=n_estimators, **params)
+        grow_forest(model, X, y, n_estimators, progress, sample_weight=sample_weight)
+        return model
+
+    def load(self, path, mmap=False):
+        # mmap memory-maps the tree arrays read-only
+        return joblib.load(path, mmap_mode="r" if mmap else None)
+
+    def dump(self, model, path):
+        joblib.dump(model, path)
+
+
+class QuantileEstimator:
+    """TaskTimeQuantiles in a .npy file. Refitting it is cheap, so it is always rebuilt in full."""
+
+    kind = "quantiles"
+    path = QUANTILE_MODEL_PATH
+    incremental = False
+
+    def fit(self, X, y, sample_weight, progress, params=None):
+        progress("fitting", 0.0)
+        model = TaskTimeQuantiles().fit(X, y, sample_weight)
+        progress("fitting", 1.0)
+        return model
+
+    def load(self, path, mmap=False):
+        return TaskTimeQuantiles.load(path, mmap)
+
+    def dump(self, model, path):
+        model.save(path)
+
+
+MODEL_ESTIMATORS = {estimator.kind: estimator for estimator in (ForestEstimator(), QuantileEstimator())}
+
+
+def model_files(meta, estimator):
+    """The (model, label encoder) paths of the version meta describes, in estimator's format"""
+    if meta and meta.get("model_dir"):
+        return (os.path.join(meta["model_dir"], os.path.basename(estimator.path)),
+                os.path.join(meta["model_dir"], os.path.basename(ENCODER_PATH)))
+    # Saved before versions had folders of their own
+    return estimator.path, ENCODER_PATH
+
+
+class ModelRegistry:
+    """Keeps the trained model and label encoder in memory between calls.
+
+    They are only deserialized again when model_meta.json changes, i.e. after train_model()
+    saves a new version. Both files are read from the folder that one metadata file names,
+    and a saved version's files are never rewritten, so a model and encoder from different
+    versions can't be paired up. With mmap=True the model's arrays are memory-mapped
+    read-only, so several processes serving the same model share its pages. estimator picks
+    the model format (one of MODEL_ESTIMATORS, MODEL_KIND's by default).
+    """
+
+    def __init__(self, estimator=None, mmap=False):
+        self.estimator = estimator or MODEL_ESTIMATORS[MODEL_KIND]
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._model = None
+        self._encoder = None
+
+    def paths(self):
+        """The (model, label encoder) paths of the current version"""
+        return model_files(load_model_meta(), self.estimator)
+
+    def _file_stamp(self):
+        # Every save replaces the metadata file, giving it a new inode
+        try:
+            st = os.stat(MODEL_META_PATH)
+            return st.st_ino, st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            # A model from before the metadata existed; raises FileNotFoundError if there is none
+            stats = [os.stat(path) for path in model_files(None, self.estimator)]
+            return tuple((st.st_mtime_ns, st.st_size) for st in stats)
+
+    def get(self):
+        """Return (model, label_encoder), loading them from disk only if a new version was saved"""
+        stamp = self._file_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                # If another save lands after the stamp was taken, this loads the newer
+                # version and the next get() loads it once more; the pair still matches
+                model_path, encoder_path = self.paths()
+                with MODEL_LOAD_SECONDS.time():
+                    model = self.estimator.load(model_path, self.mmap)
+                    encoder = joblib.load(encoder_path)
+                self._model, self._encoder, self._stamp = model, encoder, stamp
+            return self._model, self._encoder
+
+    def invalidate(self):
+        """Forget the cached model so the next get() reloads it"""
+        with self._lock:
+            self._stamp = None
+            self._model = None
+            self._encoder = None
+
+
+# Shared by every generate_schedule() call in this process. Set MODEL_MMAP=1 to memory-map.
+model_registry = ModelRegistry(mmap=os.environ.get("MODEL_MMAP") == "1")
+
+
+def load_task_counts():
+    """Load the aggregated training data: one (name, minutes, count) row per task name and time.
+
+    Reads through the feature cache in FEATURE_CACHE_PATH, keyed by FEATURE_SCHEMA_VERSION
+    and the training database's store id and revision. Only the rows upserted since the
+    cached revision are read from SQLite and merged in, so training again with no new data
+    doesn't read task_time_counts at all.
+    """
+    conn = sqlite3.connect(TRAINING_DB)
+    try:
+        # Run directly, this may be the first thing to open a database from an older version
+        training_store.init_training_db(conn)
+        revision, store_id = conn.execute("SELECT revision, store_id FROM training_revision").fetchone()
+        cache = load_feature_cache()
+        if cache is not None and (str(cache["store_id"]) != store_id or int(cache["revision"]) > revision):
+            cache = None  # another database, or one that was recreated
+        if cache is not None and int(cache["revision"]) == revision:
+            return feature_cache_frame(cache)
+        since = -1 if cache is None else int(cache["revision"])
+        changed = pd.read_sql_query("SELECT name, minutes, count FROM task_time_counts WHERE revision > ?",
+                                    conn, params=(since,))
+    finally:
+        conn.close()
+
+    df = changed
+    if cache is not None:
+        # Changed rows carry their new total count, so they replace the cached ones
+        df = pd.concat([feature_cache_frame(cache), changed]).drop_duplicates(['name', 'minutes'], keep='last')
+    df = df.sort_values(['name', 'minutes'], ignore_index=True)
+    save_feature_cache(df, store_id, revision)
     return df
 
 
+def load_feature_cache():
+    """The arrays saved by save_feature_cache() as a dict, or None if missing, unreadable or outdated"""
+    try:
+        with np.load(FEATURE_CACHE_PATH) as data:
+            if int(data["schema"]) != FEATURE_SCHEMA_VERSION:
+                return None
+            return {key: data[key] for key in data.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def save_feature_cache(df, store_id, revision):
+    """Save a load_task_counts() frame as flat arrays in FEATURE_CACHE_PATH.
+
+    Task names are stored once, sorted (the classes a LabelEncoder fitted on them would
+    have), and each row as its index into them plus minutes and count.
+    """
+    names, task_encoded = np.unique(df['name'].to_numpy(dtype=str), return_inverse=True)
+
+    def write(path):
+        # A file object, np.savez would add .npz to replace_file's temporary name
+        with open(path, "wb") as f:
+            np.savez(f, schema=FEATURE_SCHEMA_VERSION, store_id=store_id, revision=revision, names=names,
+                     task_encoded=task_encoded.astype(np.int32), minutes=df['minutes'].to_numpy(dtype=np.int32),
+                     count=df['count'].to_numpy(dtype=np.int64))
+    replace_file(FEATURE_CACHE_PATH, write)
+
+
+def feature_cache_frame(cache):
+    return pd.DataFrame({'name': cache["names"][cache["task_encoded"]].astype(object),
+                         'minutes': cache["minutes"].astype(np.int64), 'count': cache["count"]})
+
+
+def load_model_meta():
+    """Return the bookkeeping saved with the last trained model, or None if there isn't any"""
+    try:
+        with open(MODEL_META_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def replace_file(path, write):
+    """Call write(tmp_path), then atomically move the result over path.
+
+    Readers (e.g. the backend's ModelRegistry) see either the old file or the new one,
+    never a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_model(model, le_task, meta):
+    """Write the model and label encoder as a new version, point the metadata at it and drop the in-memory copy.
+
+    Saves are serialized by a lock file in MODEL_DIR, so trainings running at the same time
+    (e.g. started by different gunicorn workers) get consecutive versions instead of
+    writing into the same folder.
+    """
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with FileLock(os.path.join(MODEL_DIR, ".lock")):
+        previous = load_model_meta() or {}
+        version = previous.get("version", 0) + 1
+        # A folder left behind by a save that died before its metadata was written is skipped
+        while True:
+            try:
+                os.mkdir(os.path.join(MODEL_DIR, f"v{version}"))
+                break
+            except FileExistsError:
+                version += 1
+        meta["version"] = version
+        meta["kind"] = model_registry.estimator.kind
+        meta["trained_at"] = datetime.now().isoformat(timespec="seconds")
+        meta["model_dir"] = os.path.join(MODEL_DIR, f"v{version}")
+
+        model_path, encoder_path = model_files(meta, model_registry.estimator)
+        replace_file(encoder_path, lambda path: joblib.dump(le_task, path))
+        replace_file(model_path, lambda path: model_registry.estimator.dump(model, path))
+
+        # Readers only look at the new files once this points at them
+        def write_meta(path):
+            with open(path, "w") as f:
+                json.dump(meta, f, indent=2)
+        replace_file(MODEL_META_PATH, write_meta)
+        model_registry.invalidate()
+        prune_model_versions(version)
+    return meta
+
+
+def prune_model_versions(current):
+    """Delete the folders of versions older than the previous one, which a reader may still be loading"""
+    for name in os.listdir(MODEL_DIR):
+        match = re.fullmatch(r"v(\d+)", name)
+        if match and int(match.group(1)) < current - 1:
+            # ignore_errors: on Windows a memory-mapped file can't be deleted until it is unmapped
+            shutil.rmtree(os.path.join(MODEL_DIR, name), ignore_errors=True)
+
+
 def convert_time_to_minutes(time_str):
-    """Convert a time string (e.g. '7:00PM') to the number of minutes from midnight"""
-    time_obj = datetime.strptime(time_str, "%I:%M%p")
-    return time_obj.hour * 60 + time_obj.minute
+    """Convert a time string (e.g. '7:00 PM') to the number of minutes from midnight"""
+    minutes = parse_time_to_minutes(time_str)
+    if minutes is None:
+        raise ValueError(f"Unrecognised time: {time_str!r}")
+    return minutes
 
 
 def convert_minutes_to_time(minutes):
     """Convert minutes since midnight to time in 12-hour AM/PM format"""
-    # Round the minutes to the nearest integer to avoid float-related issues
-    minutes = int(round(minutes))
+    return format_minutes(minutes)
 
-    hour = minutes // 60
-    minute = minutes % 60
-    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
 
+def parse_times(times):
+    """Vectorized convert_time_to_minutes for a Series of time strings.
+
+    Accepts every format the UI allows ('7:00 PM', '07:00PM', '7:00pm'). Returns a float
+    Series of minutes from midnight, with NaN for rows that don't parse, so callers can
+    report all the bad rows at once instead of failing on the first one.
+    """
+    # A schedule only has a few thousand distinct time strings, so parse each one once
+    # and broadcast the results back with the factorize codes.
+    codes, uniques = pd.factorize(times)
+    parts = pd.Series(uniques, dtype="string").str.strip().str.extract(TIME_PATTERN.pattern, flags=re.IGNORECASE)
+    hour = pd.to_numeric(parts[0]) % 12 + (parts[2].str.upper() == "PM") * 12
+    unique_minutes = (hour * 60 + pd.to_numeric(parts[1])).to_numpy(dtype="float64", na_value=np.nan)
+    # Code -1 marks missing values; point it at an extra NaN slot
+    unique_minutes = np.append(unique_minutes, np.nan)
+    return pd.Series(unique_minutes[codes], index=times.index)
+
+
+# Every formatted time of day, indexed by minutes from midnight
+TIME_LABELS = np.array([convert_minutes_to_time(minutes) for minutes in range(24 * 60)], dtype=object)
+
+
+def format_times(minutes):
+    """Vectorized convert_minutes_to_time for an array of minutes from midnight"""
+    minutes = np.rint(np.asarray(minutes, dtype="float64")).astype(np.int64) % (24 * 60)
+    return TIME_LABELS[minutes].tolist()
+
+
+def drop_invalid_times(df):
+    """Parse df['time'] into df['time_minutes'] and drop the rows that don't parse, listing them once"""
+    df['time_minutes'] = parse_times(df['time'])
+    invalid = df['time_minutes'].isna()
+    if invalid.any():
+        columns = [column for column in ('id', 'name', 'time') if column in df]
+        examples = df.loc[invalid, columns].head(10).to_dict('records')
+        print(f"⚠️ Skipping {int(invalid.sum())} rows with unrecognised times, e.g. {examples}")
+        df = df[~invalid].copy()
+    return df
 
-def train_model(df):
-    """Train the RandomForestRegressor model using task data"""
-    # Check the distribution of 'Terra' tasks in your training data
-    df_terra = df[df['name'] == 'Terra']
-    print(df_terra['time'].value_counts())  # This will print the distribution of times for Terra
 
+def aggregate_task_times(df):
+    """Collapse raw (name, time) rows into the (name, minutes, count) shape of load_task_counts()"""
+    df = drop_invalid_times(df)
+    counts = df.groupby(['name', 'time_minutes']).size().reset_index(name='count')
+    return counts.rename(columns={'time_minutes': 'minutes'}).astype({'minutes': 'int64'})
+
+
+def build_features(df, le_task):
+    """Return the (X, y, sample_weight) training arrays for a load_task_counts() frame"""
     # Convert time to a numerical feature (e.g., extract the hour from time)
-    df['time_hour'] = pd.to_datetime(df['time'], errors='coerce').dt.hour
+    df['time_hour'] = df['minutes'] // 60
+
+    df['task_encoded'] = le_task.transform(df['name'])
+
+    # Prepare the features (task and time); each row stands for `count` identical tasks
+    X = df[['task_encoded', 'time_hour']]  # Use task encoding and time in hour
+    y = df['minutes']  # Minutes from midnight as target
+    return X, y, df['count']
+
+
+def counts_snapshot(df):
+    """The counts in df as {name: {minutes: count}}, JSON-friendly, for the model metadata"""
+    snapshot = {}
+    for name, minutes, count in df[['name', 'minutes', 'count']].itertuples(index=False):
+        snapshot.setdefault(name, {})[str(minutes)] = int(count)
+    return snapshot
+
+
+def counts_since(df, snapshot):
+    """Rows of df whose count grew since snapshot, with the growth as their count.
+
+    Returns None when some count went down instead, which a model can't unlearn.
+    """
+    trained = np.array([snapshot.get(name, {}).get(str(minutes), 0)
+                        for name, minutes in df[['name', 'minutes']].itertuples(index=False)], dtype="int64")
+    known = sum(len(times) for times in snapshot.values())
+    delta = df.assign(count=df['count'].to_numpy() - trained)
+    if (delta['count'] < 0).any() or (trained > 0).sum() < known:
+        return None
+    return delta[delta['count'] > 0].reset_index(drop=True)
 
+
+def no_progress(phase, fraction):
+    pass
+
+
+def grow_forest(model, X, y, n_estimators, progress=no_progress, sample_weight=None):
+    """Fit warm-started trees until model has n_estimators of them, FIT_STEP trees at a time"""
+    first = len(getattr(model, "estimators_", []))
+    grown = first
+    model.set_params(warm_start=True)
+    while grown < n_estimators:
+        grown = min(grown + FIT_STEP, n_estimators)
+        model.set_params(n_estimators=grown)
+        model.fit(X, y, sample_weight=sample_weight)
+        progress("fitting", (grown - first) / (n_estimators - first))
+
+
+def train_model(df, progress=no_progress, params=None):
+    """Train the model from scratch using task data and return its metadata.
+
+    df is either a load_task_counts() frame or raw rows with 'name' and 'time' columns,
+    which are aggregated first. params are passed to the estimator; by default the ones
+    the current model was trained with are kept (e.g. the configuration select_model()
+    picked). progress(phase, fraction) is called as training moves through its phases.
+    """
     # Convert target 'time' to numerical values (e.g., minutes from midnight)
-    df['time_minutes'] = df['time'].apply(convert_time_to_minutes)
+    progress("preparing", 0.0)
+    if 'count' not in df:
+        df = aggregate_task_times(df)
+
+    # Check the distribution of 'Terra' tasks in your training data
+    df_terra = df[df['name'] == 'Terra']
+    print(df_terra.set_index('minutes')['count'])  # This will print the distribution of times for Terra
 
     # One-hot encode the task names
     le_task = LabelEncoder()
-    df['task_encoded'] = le_task.fit_transform(df['name'])
+    le_task.fit(df['name'])
+    X, y, weight = build_features(df, le_task)
 
-    # Prepare the features (task and time)
-    X = df[['task_encoded', 'time_hour']]  # Use task encoding and time in hour
-    y = df['time_minutes']  # Use the new 'time_minutes' as target
-
-    # Train RandomForestRegressor model
-    model = RandomForestRegressor()
-    model.fit(X, y)
+    # Train the configured model (a RandomForestRegressor unless MODEL_KIND says otherwise)
+    if params is None:
+        previous = load_model_meta() or {}
+        if previous.get("kind", "forest") == model_registry.estimator.kind:
+            params = previous.get("params")
+    model = model_registry.estimator.fit(X, y, weight, progress, params)
 
     # Save the model and the label encoder
-    joblib.dump(model, "model.pkl")
-    joblib.dump(le_task, "label_encoder.pkl")
+    progress("saving", 1.0)
+    meta = save_model(model, le_task, {"rows": int(df['count'].sum()), "trained_counts": counts_snapshot(df),
+                                       "params": params or {}})
     print("✅ Model and label encoder saved!")
+    return meta
 
 
-def generate_schedule(task_names):
-    """Generate a predicted schedule using the trained model"""
+def train_model_incremental(progress=no_progress):
+    """Update the saved model with the training data added since it was last trained.
+
+    The counts the model was trained on are kept in its metadata; when they have grown, extra
+    warm-started trees are added, as many as make the new trees' share of the forest match
+    the new rows' share of all the data seen so far. The new trees are fitted on all the
+    counts (only O(names x minutes) rows), not just the growth: trees that only saw the
+    recently deleted tasks would predict their times for every other task too.
+    Falls back to a full rebuild when there is no saved model yet, when the new data
+    contains task names the label encoder doesn't know or counts went down, or once the
+    forest has grown past MAX_TREES. Estimators that can't grow (see MODEL_ESTIMATORS)
+    are always rebuilt. Returns the metadata of the model now on disk.
+    """
+    progress("loading", 0.0)
+    meta = load_model_meta()
+    counts = load_task_counts()
+    model_path, encoder_path = model_files(meta, model_registry.estimator)
+    if meta is None or "trained_counts" not in meta or not os.path.exists(model_path):
+        print("No saved model, training from scratch.")
+        return train_model(counts, progress)
+    if meta.get("kind", "forest") != model_registry.estimator.kind:
+        print(f"Switching to the {model_registry.estimator.kind} model, training from scratch.")
+        return train_model(counts, progress)
+
+    delta = counts_since(counts, meta["trained_counts"])
+    if delta is None:
+        print("Training data was removed since the last training, rebuilding the model.")
+        return train_model(counts, progress)
+    if delta.empty:
+        print("✅ Model already up to date.")
+        return meta
+    if not model_registry.estimator.incremental:
+        # e.g. the quantile table, which refits from the counts in milliseconds
+        return train_model(counts, progress)
+
+    # Work on a private copy, the registry's instance may be serving predictions
+    model = model_registry.estimator.load(model_path)
+    le_task = joblib.load(encoder_path)
+
+    if not set(delta['name']).issubset(le_task.classes_):
+        print("New task names since the last training, rebuilding the model.")
+        return train_model(counts, progress)
+
+    new_rows = int(delta['count'].sum())
+    total_rows = meta["rows"] + new_rows
+    extra_trees = max(1, math.ceil(model.n_estimators * new_rows / max(meta["rows"], 1)))
+    if model.n_estimators + extra_trees > MAX_TREES:
+        print("Forest reached its size limit, rebuilding the model.")
+        return train_model(counts, progress)
+
+    X, y, weight = build_features(counts, le_task)
+    grow_forest(model, X, y, model.n_estimators + extra_trees, progress, sample_weight=weight)
+
+    progress("saving", 1.0)
+    # Keep the params so the next full rebuild uses the same configuration
+    meta = save_model(model, le_task, {"rows": total_rows, "trained_counts": counts_snapshot(counts),
+                                       "params": meta.get("params") or {}})
+    print(f"✅ Model updated with {new_rows} new rows ({extra_trees} new trees).")
+    return meta
+
+
+def split_counts(counts, folds, seed=0):
+    """Deal each row's count out over folds at random; returns a (rows, folds) array of counts.
+
+    Cross-validating the aggregated rows this way is the same as splitting the raw tasks
+    they stand for.
+    """
+    return np.random.default_rng(seed).multinomial(np.asarray(counts, dtype=np.int64), [1 / folds] * folds)
+
+
+def evaluate_candidate(kind, params, X, y, train_weight, test_weight):
+    """Fit one candidate on the train_weight rows and score it on the test_weight ones.
+
+    Returns (mean absolute error in minutes, fit seconds, predict seconds), or None when the
+    fold has no rows to train on or no held-out row that can be scored. Predictions use the
+    same dummy time_hour as predict_minutes(), so the score is what users would get.
+    """
+    train = train_weight > 0
+    codes = X['task_encoded'].to_numpy()
+    # A task whose every row landed in the test fold can't be predicted, leave it out
+    test = (test_weight > 0) & np.isin(codes, codes[train])
+    if not train.any() or not test.any():
+        return None
+
+    start = time.perf_counter()
+    model = MODEL_ESTIMATORS[kind].fit(X[train], y[train], train_weight[train], no_progress, params)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = model.predict(X[test].assign(time_hour=9))
+    predict_seconds = time.perf_counter() - start
+    error = np.average(np.abs(predicted - y[test].to_numpy()), weights=test_weight[test])
+    return float(error), fit_seconds, predict_seconds
+
+
+def select_model(df=None, budget_seconds=MODEL_SELECTION_BUDGET_SECONDS, folds=5, n_jobs=None,
+                 progress=no_progress):
+    """Cross-validate MODEL_CANDIDATES in parallel and train the best one of MODEL_KIND's kind.
+
+    The (candidate, fold) fits run on n_jobs threads (a thread per core by default); the
+    tree builders release the GIL, so they use every core. Fits that haven't started when
+    budget_seconds runs out are cancelled and candidates missing folds are left out of the
+    ranking (fits already running finish in the background). folds is capped at the number
+    of training rows, and folds that still end up with nothing to score are skipped; with
+    too little data for any fold to be scored, the model is trained with its current
+    configuration instead. Every candidate's accuracy and timings are written to
+    MODEL_SELECTION_PATH. Returns the metadata of the model on disk, which is left alone if
+    no candidate of the configured kind finished in time.
+    """
+    started = time.monotonic()
+    progress("preparing", 0.0)
+    if df is None:
+        df = load_task_counts()
+    elif 'count' not in df:
+        df = aggregate_task_times(df)
+    le_task = LabelEncoder()
+    le_task.fit(df['name'])
+    X, y, weight = build_features(df, le_task)
+    folds = max(2, min(folds, int(weight.sum())))
+    fold_counts = split_counts(weight, folds)
+    total = fold_counts.sum(axis=1)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    candidates = [{"kind": kind, "params": params, "folds": []} for kind, params in MODEL_CANDIDATES]
+    pool = ThreadPoolExecutor(max_workers=n_jobs, thread_name_prefix="model-selection")
+    jobs = {pool.submit(evaluate_candidate, candidate["kind"], candidate["params"], X, y,
+                        total - fold_counts[:, fold], fold_counts[:, fold]): candidate
+            for candidate in candidates for fold in range(folds)}
+    pending = set(jobs)
     try:
-        # Load the trained model and label encoder
-        model = joblib.load("model.pkl")
-        le_task = joblib.load("label_encoder.pkl")
-    except FileNotFoundError:
-        print("❌ Model not found. Train the model first using train_model(df).")
-        return
+        while pending:
+            remaining = started + budget_seconds - time.monotonic()
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for job in done:
+                jobs[job]["folds"].append(job.result())
+            progress("cross-validating", 1 - len(pending) / len(jobs))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for candidate in candidates:
+        completed = candidate.pop("folds")
+        results = np.array([result for result in completed if result is not None]).reshape(-1, 3)
+        candidate["folds_completed"] = len(completed)
+        candidate["folds_skipped"] = len(completed) - len(results)  # nothing to train on or score
+        if len(results):
+            candidate["mean_abs_error_minutes"] = round(float(results[:, 0].mean()), 2)
+            candidate["error_std_minutes"] = round(float(results[:, 0].std()), 2)
+            candidate["fit_seconds"] = round(float(results[:, 1].mean()), 4)
+            candidate["predict_seconds"] = round(float(results[:, 2].mean()), 5)
+    ranked = sorted((candidate for candidate in candidates
+                     if candidate["folds_completed"] == folds and "mean_abs_error_minutes" in candidate),
+                    key=lambda candidate: candidate["mean_abs_error_minutes"])
+    best = next((candidate for candidate in ranked if candidate["kind"] == model_registry.estimator.kind), None)
+
+    report = {"created_at": datetime.now().isoformat(timespec="seconds"), "budget_seconds": budget_seconds,
+              "folds": folds, "n_jobs": n_jobs, "rows": int(weight.sum()),
+              "cross_validation_seconds": round(time.monotonic() - started, 2), "candidates": candidates,
+              "best_overall": ranked[0] if ranked else None, "selected": best}
+    if all(candidate["folds_completed"] == folds == candidate["folds_skipped"] for candidate in candidates):
+        print(f"⚠️ Too little training data ({int(weight.sum())} rows) to cross-validate, "
+              f"training with the current configuration.")
+        meta = train_model(df, progress)
+        report["model_version"] = meta["version"]
+    elif best is None:
+        print(f"⚠️ No {model_registry.estimator.kind} candidate finished {folds} folds within "
+              f"{budget_seconds:g}s, keeping the current model.")
+        meta = load_model_meta()
+    else:
+        meta = train_model(df, progress, params=best["params"])
+        report["model_version"] = meta["version"]
+        if ranked[0] is not best:
+            print(f"Best overall was the {ranked[0]['kind']} model, set MODEL_KIND={ranked[0]['kind']} to use it.")
 
+    def write_report(path):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    replace_file(MODEL_SELECTION_PATH, write_report)
+    return meta
+
+
+def known_task_names():
+    """Task names the current model can predict (raises FileNotFoundError if there is no model)"""
+    _, le_task = model_registry.get()
+    return set(le_task.classes_)
+
+
+def predict_minutes(model, le_task, task_names):
+    """Predicted minutes from midnight for each task name, as a float array"""
     # Encode the task names
     encoded_tasks = le_task.transform(task_names)
-    # Create a dummy 'time_hour' feature (e.g., setting it to a default time like 9 AM for now)
-    time_hour_dummy = [9] * len(task_names)  # You can choose another time if you want
-
-    # Combine both encoded task names and time hour for prediction
-    X_new = np.array(list(zip(encoded_tasks, time_hour_dummy)))
+    # Combine the encoded task names with a dummy 'time_hour' feature (9 AM for now)
+    X_new = pd.DataFrame({'task_encoded': encoded_tasks, 'time_hour': 9})
 
     # Make predictions (the predicted times will be in minutes)
-    predicted_times = model.predict(X_new)
+    return model.predict(X_new)
+
+
+def predict_times(task_names):
+    """Predict a time ('7:00 PM' style) for each task name with the resident model.
+
+    Raises FileNotFoundError when no model has been trained and ValueError for task names
+    the model has never seen.
+    """
+    # The trained model and label encoder stay loaded between calls
+    model, le_task = model_registry.get()
+
+    with MODEL_PREDICT_SECONDS.time():
+        predicted_times = predict_minutes(model, le_task, task_names)
 
-    # Convert predicted times back to time format (if needed)
-    predicted_times_in_format = [convert_minutes_to_time(minutes) for minutes in predicted_times]
+        # Convert predicted times back to time format (if needed)
+        times = format_times(predicted_times)
+    MODEL_PREDICTED_TASKS.inc(len(task_names))
+    return times
 
-    # Save the predictions to the database
-    conn = sqlite3.connect("predicted_schedule.db")
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS ai_schedule (
+
+def generate_schedule(task_names):
+    """Generate a predicted schedule using the trained model, save it as a new run and return the run id"""
+    try:
+        predicted_times_in_format = predict_times(task_names)
+    except FileNotFoundError:
+        print("❌ Model not found. Train the model first using train_model(df).")
+        return
+
+    meta = load_model_meta() or {}
+    run_id = save_prediction_run(task_names, predicted_times_in_format, meta.get("version"))
+    print(f"✅ AI-generated schedule saved to {PREDICTIONS_DB} (run {run_id})")
+    return run_id
+
+
+def init_predictions_db(conn):
+    """Create the prediction tables, upgrading a pre-run ai_schedule table in place"""
+    # Pruned pages go back to the OS with PRAGMA incremental_vacuum. Switching an existing
+    # file over needs one full VACUUM; the table only ever holds a few runs, so it's cheap.
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS ai_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at TEXT NOT NULL,
+        model_version INTEGER,
+        task_count INTEGER NOT NULL
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS ai_schedule (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT,
         time TEXT
     )''')
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(ai_schedule)")]
+    if 'run_id' not in columns:
+        # Rows written before runs existed keep run_id NULL and go with the first prune
+        conn.execute("ALTER TABLE ai_schedule ADD COLUMN run_id INTEGER REFERENCES ai_runs(id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_schedule_run ON ai_schedule (run_id, id)")
+
 
-    for name, time in zip(task_names, predicted_times_in_format):
-        cursor.execute("INSERT INTO ai_schedule (name, time) VALUES (?, ?)", (name, time))
+def save_prediction_run(task_names, times, model_version=None):
+    """Store one generated schedule as a new run in a single transaction and return its id.
+
+    Runs older than the newest PREDICTION_RUN_RETENTION are deleted in the same transaction.
+    """
+    conn = sqlite3.connect(PREDICTIONS_DB)
+    try:
+        init_predictions_db(conn)
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO ai_runs (created_at, model_version, task_count) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), model_version, len(task_names)))
+            run_id = cursor.lastrowid
+            conn.executemany("INSERT INTO ai_schedule (run_id, name, time) VALUES (?, ?, ?)",
+                             [(run_id, name, time) for name, time in zip(task_names, times)])
 
-    conn.commit()
-    conn.close()
-    print("✅ AI-generated schedule saved to predicted_schedule.db")
+            oldest_kept = run_id - max(PREDICTION_RUN_RETENTION, 1) + 1
+            pruned = conn.execute("DELETE FROM ai_schedule WHERE run_id IS NULL OR run_id < ?",
+                                  (oldest_kept,)).rowcount
+            conn.execute("DELETE FROM ai_runs WHERE id < ?", (oldest_kept,))
+        if pruned:
+            conn.execute("PRAGMA incremental_vacuum")
+        return run_id
+    finally:
+        conn.close()
+
+
+def load_latest_run():
+    """Return the newest generated schedule as a dict, or None if nothing has been generated yet.
+
+    Only reads: the schema is created and migrated by save_prediction_run(), so a database
+    it hasn't written to yet has no runs.
+    """
+    if not os.path.exists(PREDICTIONS_DB):
+        return None
+    conn = sqlite3.connect(PREDICTIONS_DB)
+    try:
+        try:
+            run = conn.execute(
+                "SELECT id, created_at, model_version FROM ai_runs ORDER BY id DESC LIMIT 1").fetchone()
+        except sqlite3.OperationalError:
+            return None  # no ai_runs table, written before runs existed
+        if run is None:
+            return None
+        rows = conn.execute("SELECT name, time FROM ai_schedule WHERE run_id = ? ORDER BY id", (run[0],))
+        return {"run_id": run[0], "created_at": run[1], "model_version": run[2],
+                "tasks": [{"name": name, "time": time} for name, time in rows]}
+    finally:
+        conn.close()
 
 
 # 🔽 Add this so it runs when script is executed directly
 if __name__ == "__main__":
-    df = load_task_data()
-    train_model(df)
+    train_model_incremental()
 
     # Example task names to generate predictions for:
     task_names = ["Terra", "Gaming"]
@@ -0,0 +1,215 @@
+import json
+
+from PyQt6.QtCore import QObject, QTimer, QUrl, QUrlQuery, pyqtSignal
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+# Give up on a request when the backend sends nothing for this long
+DEFAULT_TIMEOUT_MS = 5000
+# Event streams get a keep-alive every 15 s; treat a much longer silence as a dead connection
+STREAM_TIMEOUT_MS = 45000
+STREAM_MAX_RETRY_MS = 30000
+
+
+class ApiResponse:
+    """Status code, decoded JSON body (or None) and headers (lower-cased names) of a finished request."""
+
+    def __init__(self, status, data, headers):
+        self.status = status
+        self.data = data
+        self.headers = headers
+
+
+class ApiReply(QObject):
+    """Handle for one in-flight request. Exactly one of the signals fires, on the GUI thread."""
+
+    finished = pyqtSignal(object)  # ApiResponse, for any HTTP status
+    failed = pyqtSignal(str)  # network error or timeout, no HTTP response at all
+
+    def __init__(self, reply, parent=None):
+        super().__init__(parent)
+        self.reply = reply
+        self.superseded = False
+
+    def cancel(self):
+        """Abort the request without emitting either signal."""
+        self.superseded = True
+        self.reply.abort()
+
+
+class ApiClient(QObject):
+    """Asynchronous JSON client for the planner backend.
+
+    Built on QNetworkAccessManager, so requests run on Qt's event loop instead of blocking
+    the GUI thread, and HTTP keep-alive connections to the backend are reused between
+    requests. Requests sent with the same key supersede each other: starting a new one
+    aborts the previous one if it hasn't finished yet.
+    """
+
+    def __init__(self, base_url, timeout_ms=DEFAULT_TIMEOUT_MS, parent=None):
+        super().__init__(parent)
+        self.base_url = base_url.rstrip("/")
+        self.timeout_ms = timeout_ms
+        self.manager = QNetworkAccessManager(self)
+        self._pending = {}  # key -> ApiReply
+
+    def get(self, path="", **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path="", **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path="", **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path="", **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def stream(self, path):
+        """Open a server-sent event stream; see EventStream."""
+        return EventStream(self, path, parent=self)
+
+    def request(self, method, path="", json_body=None, params=None, headers=None, key=None):
+        url = QUrl(self.base_url + path)
+        if params:
+            query = QUrlQuery()
+            for name, value in params.items():
+                query.addQueryItem(name, str(value))
+            url.setQuery(query)
+
+        request = QNetworkRequest(url)
+        request.setTransferTimeout(self.timeout_ms)
+        for name, value in (headers or {}).items():
+            request.setRawHeader(name.encode(), str(value).encode())
+
+        body = b""
+        if json_body is not None:
+            request.setHeader(QNetworkRequest.KnownHeaders.ContentTypeHeader, "application/json")
+            body = json.dumps(json_body).encode()
+
+        if key is not None and key in self._pending:
+            self._pending.pop(key).cancel()
+
+        api_reply = ApiReply(self.manager.sendCustomRequest(request, method.encode(), body), self)
+        if key is not None:
+            self._pending[key] = api_reply
+        api_reply.reply.finished.connect(lambda: self._on_finished(api_reply, key))
+        return api_reply
+
+    def _on_finished(self, api_reply, key):
+        reply = api_reply.reply
+        if key is not None and self._pending.get(key) is api_reply:
+            del self._pending[key]
+        try:
+            if api_reply.superseded:
+                return
+
+            status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+            if status is None:
+                # No HTTP response: connection refused, timeout, ...
+                if reply.error() in (QNetworkReply.NetworkError.TimeoutError,
+                                     QNetworkReply.NetworkError.OperationCanceledError):
+                    message = f"No response from the server within {self.timeout_ms / 1000:g}s"
+                else:
+                    message = reply.errorString()
+                api_reply.failed.emit(message)
+                return
+
+            raw = bytes(reply.readAll())
+            try:
+                data = json.loads(raw) if raw else None
+            except ValueError:
+                data = None
+            headers = {bytes(name).decode().lower(): bytes(value).decode() for name, value in reply.rawHeaderPairs()}
+            api_reply.finished.emit(ApiResponse(status, data, headers))
+        finally:
+            reply.deleteLater()
+            api_reply.deleteLater()
+
+
+class EventStream(QObject):
+    """Reads a server-sent event stream from the backend and reconnects when it drops.
+
+    Reconnects wait for the server's retry: hint, doubling on repeated failures, and resume
+    from the last event id so nothing sent in between is missed.
+    """
+
+    event_received = pyqtSignal(str, str)  # event name, data
+    connected = pyqtSignal()
+    disconnected = pyqtSignal(str)
+
+    def __init__(self, client, path, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.path = path
+        self.reply = None
+        self.last_event_id = None
+        self.retry_ms = 3000
+        self._failures = 0
+        self._buffer = b""
+        self._event = {}
+        self._closed = False
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self.open)
+
+    def open(self):
+        self._closed = False
+        request = QNetworkRequest(QUrl(self.client.base_url + self.path))
+        request.setTransferTimeout(STREAM_TIMEOUT_MS)
+        request.setRawHeader(b"Accept", b"text/event-stream")
+        if self.last_event_id is not None:
+            request.setRawHeader(b"Last-Event-ID", self.last_event_id.encode())
+        self._buffer = b""
+        self._event = {}
+        self.reply = self.client.manager.get(request)
+        self.reply.metaDataChanged.connect(self._on_headers)
+        self.reply.readyRead.connect(self._on_ready_read)
+        self.reply.finished.connect(self._on_finished)
+
+    def close(self):
+        self._closed = True
+        self._retry_timer.stop()
+        if self.reply is not None:
+            self.reply.abort()
+
+    def _on_headers(self):
+        if self.reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute) == 200:
+            self._failures = 0
+            self.connected.emit()
+
+    def _on_ready_read(self):
+        self._buffer += bytes(self.reply.readAll())
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            self._handle_line(line.rstrip(b"\r").decode("utf-8", "replace"))
+
+    def _handle_line(self, line):
+        if not line:
+            # A blank line ends the event
+            if "data" in self._event:
+                self.event_received.emit(self._event.get("event", "message"), self._event["data"])
+            self._event = {}
+            return
+        if line.startswith(":"):
+            return  # comment / keep-alive
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "data":
+            self._event["data"] = self._event["data"] + "\n" + value if "data" in self._event else value
+        elif field == "event":
+            self._event["event"] = value
+        elif field == "id":
+            self.last_event_id = value
+        elif field == "retry" and value.isdigit():
+            self.retry_ms = int(value)
+
+    def _on_finished(self):
+        error = self.reply.errorString()
+        self.reply.deleteLater()
+        self.reply = None
+        if self._closed:
+            return
+        self.disconnected.emit(error)
+        self._failures += 1
+        delay = min(self.retry_ms * 2 ** (self._failures - 1), STREAM_MAX_RETRY_MS)
+        self._retry_timer.start(delay)
@@ -1,25 +1,101 @@
-import subprocess
+import json
 import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Where serve.py listens; the same variables it reads, passed to it explicitly
+BACKEND_HOST = os.environ.get("BACKEND_HOST", "127.0.0.1")
+BACKEND_PORT = int(os.environ.get("BACKEND_PORT", "5000"))
+# How long the backend gets to start answering, and to drain when the app closes
+READY_TIMEOUT_SECONDS = 30
+STOP_TIMEOUT_SECONDS = 15
+
+
+def backend_url(path):
+    # A backend listening on every interface is reached through loopback
+    host = {"0.0.0.0": "127.0.0.1", "": "127.0.0.1", "::": "::1"}.get(BACKEND_HOST, BACKEND_HOST)
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    return f"http://{host}:{BACKEND_PORT}{path}"
+
+
+HEALTH_URL = backend_url("/health")
+
 
-# Path to your virtual environment
-venv_path = os.path.join(os.getcwd(), ".venv", "Scripts", "python.exe")
+def find_python():
+    """The project's virtual environment interpreter if there is one, else the one running this script"""
+    for venv in (".venv", "venv"):
+        for candidate in (os.path.join(PROJECT_DIR, venv, "Scripts", "python.exe"),  # Windows
+                          os.path.join(PROJECT_DIR, venv, "bin", "python")):  # macOS / Linux
+            if os.path.exists(candidate):
+                return candidate
+    return sys.executable
 
-def run_backend():
-    return subprocess.Popen([venv_path, "backend.py"])
 
-def run_frontend():
-    return subprocess.Popen([venv_path, "frontend.py"])
+def run_backend(python):
+    # A process group of its own on Windows, so stop_backend() can send it Ctrl+Break
+    flags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+    return subprocess.Popen([python, os.path.join(PROJECT_DIR, "serve.py"),
+                             "--host", BACKEND_HOST, "--port", str(BACKEND_PORT)], creationflags=flags)
+
+
+def run_frontend(python):
+    return subprocess.Popen([python, os.path.join(PROJECT_DIR, "frontend.py")],
+                            env=dict(os.environ, API_URL=backend_url("/schedule")))
+
+
+def wait_until_ready(backend_process, timeout=READY_TIMEOUT_SECONDS):
+    """Poll the backend's /health until it answers 200; raises RuntimeError if it never does"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if backend_process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {backend_process.returncode}")
+        try:
+            with urllib.request.urlopen(HEALTH_URL, timeout=1) as response:
+                if json.load(response).get("status") == "ok":
+                    return
+        except (OSError, ValueError):
+            pass  # not listening yet (URLError is an OSError), or still starting up
+        time.sleep(0.1)
+    raise RuntimeError(f"Backend did not become ready within {timeout}s")
+
+
+def stop_backend(backend_process):
+    """Ask the backend to drain and exit; kill it if it takes too long"""
+    if backend_process.poll() is not None:
+        return
+    backend_process.send_signal(signal.CTRL_BREAK_EVENT if os.name == "nt" else signal.SIGTERM)
+    try:
+        backend_process.wait(STOP_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        backend_process.kill()
+        backend_process.wait()
+
 
 def run_app():
-    backend_process = run_backend()
-    frontend_process = run_frontend()
+    python = find_python()
+    backend_process = run_backend(python)
+    try:
+        # Start the UI only once the backend answers, so its first fetch doesn't fail
+        try:
+            wait_until_ready(backend_process)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+
+        frontend_process = run_frontend(python)
 
-    # Wait for the frontend process to terminate
-    frontend_process.wait()
+        # Wait for the frontend process to terminate
+        return frontend_process.wait()
+    finally:
+        # Once frontend is closed, stop the backend process
+        stop_backend(backend_process)
 
-    # Once frontend is closed, terminate the backend process
-    backend_process.terminate()
-    backend_process.wait()
 
 if __name__ == '__main__':
-    run_app()
+    sys.exit(run_app())
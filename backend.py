@@ -1,11 +1,95 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+import json
+import os
 import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import ai_scheduler
+import metrics
+from db_pool import ConnectionPool, DEFAULT_POOL_SIZE
+from prediction_batcher import PredictionBatcher
+from request_profiler import SlowRequestProfiler
+from training_jobs import TrainingJobManager
+from training_store import init_training_db, record_training_rows
+from time_utils import parse_time_to_minutes, parse_week
 
 app = Flask(__name__)
 
+TASKS_DB = os.environ.get("TASKS_DB", "tasks.db")
+TRAINING_DB = os.environ.get("TRAINING_DB", "trainingData.db")
+
+# Long-lived connections shared by all routes (size configurable with DB_POOL_SIZE)
+tasks_pool = ConnectionPool(TASKS_DB, size=DEFAULT_POOL_SIZE)
+training_pool = ConnectionPool(TRAINING_DB, size=DEFAULT_POOL_SIZE)
+
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "Time taken to produce a response",
+                                    ("method", "route"))
+RESPONSES = metrics.counter("http_responses_total", "Responses sent", ("method", "route", "status"))
+
+# Set PROFILE_SLOW_REQUESTS_MS to sample stacks of in-flight requests and save a profile
+# (to PROFILE_DIR) for each request that takes at least that long
+PROFILE_SLOW_REQUESTS_MS = os.environ.get("PROFILE_SLOW_REQUESTS_MS")
+request_profiler = None
+if PROFILE_SLOW_REQUESTS_MS:
+    request_profiler = SlowRequestProfiler(float(PROFILE_SLOW_REQUESTS_MS) / 1000,
+                                           output_dir=os.environ.get("PROFILE_DIR", "profiles"))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request_profiler:
+        request_profiler.begin()
+
+@app.after_request
+def record_request_metrics(response):
+    duration = time.perf_counter() - g.request_started
+    # The URL rule, not the path, so /schedule/<int:task_id> is one series
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(duration, method=request.method, route=route)
+    RESPONSES.inc(method=request.method, route=route, status=response.status_code)
+    if request_profiler:
+        profile = request_profiler.end(f"{request.method} {route}", duration)
+        if profile:
+            print(f"⚠️ {request.method} {request.path} took {duration * 1000:.0f} ms, profile saved to {profile}")
+    return response
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Readiness probe: 200 once the server can answer schedule requests, 503 while draining."""
+    if shutting_down.is_set():
+        return jsonify({"status": "draining"}), 503
+    try:
+        with tasks_pool.connection() as conn:
+            conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchall()
+    except sqlite3.Error as e:
+        return jsonify({"status": "error", "error": str(e)}), 503
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Request, SQLite and model metrics in the Prometheus text format."""
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+def today():
+    return date.today().isoformat()
+
+def parse_task_date(value):
+    """Normalizes a YYYY-MM-DD string; returns None if it isn't a valid date."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value.strip()).isoformat()
+    except ValueError:
+        return None
+
+# Changes kept for GET /schedule/changes; clients further behind than this reload everything
+CHANGE_LOG_RETENTION = int(os.environ.get("CHANGE_LOG_RETENTION", "10000"))
+
 # Initialize database for tasks
 def init_db():
-    with sqlite3.connect("tasks.db") as conn:
+    with tasks_pool.connection() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
@@ -19,33 +103,352 @@ def init_db():
         columns = [col[1] for col in cursor.fetchall()]
         if 'color' not in columns:
             cursor.execute("ALTER TABLE tasks ADD COLUMN color TEXT DEFAULT '#ffffff'")
-        conn.commit()
 
-# Initialize database for training data
-def init_training_data_db():
-    with sqlite3.connect("trainingData.db") as conn:
-        cursor = conn.cursor()
+        # Minutes since midnight, parsed once on write so reads can sort and filter by time
+        if 'minutes' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN minutes INTEGER")
+        cursor.execute("SELECT id, time FROM tasks WHERE minutes IS NULL")
+        backfill = [(parse_time_to_minutes(time), task_id) for task_id, time in cursor.fetchall()]
+        cursor.executemany("UPDATE tasks SET minutes=? WHERE id=?",
+                           [(minutes, task_id) for minutes, task_id in backfill if minutes is not None])
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_minutes ON tasks (minutes, id)")
+
+        # The day a task is on, as YYYY-MM-DD. Tasks from before dates existed were shown in
+        # today's column, so that is where the migration puts them.
+        if 'date' not in columns:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN date TEXT")
+            cursor.execute("UPDATE tasks SET date = ? WHERE date IS NULL", (today(),))
+        # GET /schedule?week=... reads one week as a range of this index
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_date_minutes ON tasks (date, minutes)")
+
+        # Change log: one row per write to tasks, recorded by triggers so every writer is
+        # covered. Its sequence number doubles as the schedule version (the GET /schedule ETag).
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                time TEXT NOT NULL,
-                color TEXT DEFAULT '#ffffff'
+            CREATE TABLE IF NOT EXISTS task_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id INTEGER NOT NULL,
+                op TEXT NOT NULL
             )
         ''')
-        conn.commit()
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS tasks_log_{event.lower()} AFTER {event} ON tasks
+                BEGIN
+                    INSERT INTO task_changes (task_id, op) VALUES ({row}.id, '{event.lower()}');
+                END
+            ''')
+        # Trim the log every 1000 entries rather than on every write. Recreated on every start
+        # so a changed CHANGE_LOG_RETENTION applies to existing databases too.
+        cursor.execute("DROP TRIGGER IF EXISTS task_changes_trim")
+        cursor.execute(f'''
+            CREATE TRIGGER task_changes_trim AFTER INSERT ON task_changes
+            WHEN NEW.seq % 1000 = 0
+            BEGIN
+                DELETE FROM task_changes WHERE seq <= NEW.seq - {CHANGE_LOG_RETENTION};
+            END
+        ''')
+
+        # Superseded by task_changes
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS tasks_version_{event}")
+        cursor.execute("DROP TABLE IF EXISTS schedule_version")
+
+# Initialize database for training data
+def init_training_data_db():
+    with training_pool.connection() as conn:
+        init_training_db(conn)
 
 # Call the initialization functions once
 init_db()
 init_training_data_db()
 
+# Fields a client can ask for with GET /schedule?fields=...
+TASK_FIELDS = ("id", "name", "time", "minutes", "date", "color", "ordinal")
+MAX_PAGE_SIZE = 1000
+TIME_ERROR = "Time must look like 7:00 PM"
+DATE_ERROR = "Date must look like 2025-01-31"
+
+def get_schedule_version(cursor):
+    """The sequence number of the latest change to tasks (0 before the first one)."""
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='task_changes'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def parse_minutes_arg(value):
+    """Accepts either minutes since midnight ('420') or a time string ('7:00 AM')."""
+    if value.isdigit():
+        return int(value)
+    return parse_time_to_minutes(value)
+
+def parse_schedule_query(args):
+    """Reads the GET /schedule query string into a dict. Returns (query, error)."""
+    query = {"limit": None, "cursor": None, "fields": TASK_FIELDS, "from": None, "to": None, "week": None}
+    if "week" in args:
+        query["week"] = parse_week(args["week"])
+        if query["week"] is None:
+            return None, "week must look like 2025-W07"
+        # A week is small and bounded, it is always returned whole
+        if "limit" in args or "cursor" in args:
+            return None, "week can't be combined with limit or cursor"
+    for bound in ("from", "to"):
+        if bound in args:
+            query[bound] = parse_minutes_arg(args[bound])
+            if query[bound] is None:
+                return None, f"{bound}: {TIME_ERROR} or be minutes since midnight"
+    query["by_time"] = query["from"] is not None or query["to"] is not None or args.get("sort") == "time"
+
+    try:
+        if "limit" in args:
+            query["limit"] = int(args["limit"])
+        if args.get("cursor"):
+            # id order pages by id; time order pages by (minutes, id), written as "minutes:id"
+            parts = tuple(int(part) for part in args["cursor"].split(":"))
+            if len(parts) != (2 if query["by_time"] else 1):
+                raise ValueError
+            query["cursor"] = parts
+    except ValueError:
+        return None, "Invalid limit or cursor"
+    if query["limit"] is not None and not 1 <= query["limit"] <= MAX_PAGE_SIZE:
+        return None, f"limit must be between 1 and {MAX_PAGE_SIZE}"
+
+    if args.get("fields"):
+        query["fields"] = tuple(field.strip() for field in args["fields"].split(","))
+        unknown = [field for field in query["fields"] if field not in TASK_FIELDS]
+        if unknown:
+            return None, f"Unknown fields: {', '.join(unknown)}"
+    return query, None
+
 @app.route("/schedule", methods=["GET"])
 def get_tasks():
-    with sqlite3.connect("tasks.db") as conn:
+    """Lists tasks in id order, or by time of day when a range or sort=time is given.
+
+    Optional query parameters: week (an ISO week like 2025-W07: only that week's tasks, by
+    date and time, read as one range of the (date, minutes) index), from/to (time range,
+    from inclusive and to exclusive, as '7:00 AM' or minutes since midnight), sort=time,
+    limit (page size), cursor (the X-Next-Cursor value from the previous page) and fields
+    (comma separated subset of TASK_FIELDS). Responses carry the schedule version as an
+    ETag, so a matching If-None-Match gets 304 without a table scan.
+    """
+    query, error = parse_schedule_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    fields = query["fields"]
+
+    if query["week"] is not None:
+        key_columns = ["date", "minutes", "id"]
+        where = ["date >= ?", "date < ?"]
+        params = [query["week"].isoformat(), (query["week"] + timedelta(days=7)).isoformat()]
+    elif query["by_time"]:
+        key_columns = ["minutes", "id"]
+        where = ["minutes IS NOT NULL"]
+        params = []
+    else:
+        key_columns = ["id"]
+        where = []
+        params = []
+    if query["from"] is not None:
+        where.append("minutes >= ?")
+        params.append(query["from"])
+    if query["to"] is not None:
+        where.append("minutes < ?")
+        params.append(query["to"])
+    key = f"({', '.join(key_columns)})"
+
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
+        # Read the version before the rows: if a write lands in between, the ETag is older
+        # than the data and the client simply refetches next time.
+        version = get_schedule_version(cursor)
+        etag = f"c{version}"
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        page_where = list(where)
+        page_params = list(params)
+        if query["cursor"]:
+            page_where.append(f"{key} > ({', '.join('?' * len(key_columns))})")
+            page_params.extend(query["cursor"])
+
+        columns = key_columns + [field for field in fields if field not in key_columns and field != "ordinal"]
+        sql = f"SELECT {', '.join(columns)} FROM tasks"
+        if page_where:
+            sql += f" WHERE {' AND '.join(page_where)}"
+        sql += f" ORDER BY {', '.join(key_columns)}"
+        if query["limit"] is not None:
+            # Fetch one extra row to know whether there is another page
+            sql += " LIMIT ?"
+            page_params.append(query["limit"] + 1)
+        cursor.execute(sql, page_params)
+        rows = cursor.fetchall()
+
+        # IDs are stable; the 1,2,3... numbering shown in the UI is computed here instead
+        first_ordinal = 1
+        if query["cursor"] and "ordinal" in fields:
+            before = where + [f"{key} <= ({', '.join('?' * len(key_columns))})"]
+            cursor.execute(f"SELECT COUNT(*) FROM tasks WHERE {' AND '.join(before)}",
+                           params + list(query["cursor"]))
+            first_ordinal += cursor.fetchone()[0]
+
+    next_cursor = None
+    if query["limit"] is not None and len(rows) > query["limit"]:
+        rows = rows[:query["limit"]]
+        next_cursor = ":".join(str(value) for value in rows[-1][:len(key_columns)])
+
+    tasks = []
+    for ordinal, row in enumerate(rows, start=first_ordinal):
+        values = dict(zip(columns, row))
+        values["ordinal"] = ordinal
+        tasks.append({field: values[field] for field in fields})
+
+    response = jsonify(tasks)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    # Where a client should start reading GET /schedule/changes from
+    response.headers["X-Change-Seq"] = str(version)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@app.route("/schedule/changes", methods=["GET"])
+def get_changes():
+    """Returns what changed since the change sequence number `since`.
+
+    Changes are coalesced per task: each changed task appears once, with its latest
+    operation and, unless it was deleted, its current row. Answers 410 Gone when the
+    client is further behind than the retained log, in which case it should reload
+    GET /schedule.
+    """
+    try:
+        since = int(request.args.get("since", ""))
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+
+    with tasks_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks")
-        tasks = [{"id": row[0], "name": row[1], "time": row[2], "color": row[3]} for row in cursor.fetchall()]
-    return jsonify(tasks)
+        # Read the log and the rows from one snapshot
+        cursor.execute("BEGIN")
+        latest = get_schedule_version(cursor)
+        cursor.execute("SELECT MIN(seq) FROM task_changes")
+        oldest = cursor.fetchone()[0] or latest + 1
+        if since < latest and since + 1 < oldest:
+            return jsonify({"error": "Changes since this sequence number are no longer kept", "seq": latest}), 410
+
+        cursor.execute('''
+            SELECT c.seq, c.task_id, c.op, t.name, t.time, t.minutes, t.date, t.color
+            FROM (
+                -- With MAX(), SQLite takes the bare op column from the row holding the maximum
+                SELECT MAX(seq) AS seq, task_id, op FROM task_changes WHERE seq > ? GROUP BY task_id
+            ) c
+            LEFT JOIN tasks t ON t.id = c.task_id
+            ORDER BY c.seq
+        ''', (since,))
+        rows = cursor.fetchall()
+
+    changes = []
+    for seq, task_id, op, name, time, minutes, task_date, color in rows:
+        change = {"seq": seq, "op": op, "id": task_id}
+        if op != "delete":
+            change["task"] = {"id": task_id, "name": name, "time": time, "minutes": minutes, "date": task_date,
+                              "color": color}
+        changes.append(change)
+    return jsonify({"seq": latest, "changes": changes})
+
+# Server-sent events: how often a stream re-checks the change log when nothing woke it up
+# (covers writes made by other processes), how long a burst of writes may keep going before
+# one event is sent for all of it, and how often an idle stream sends a keep-alive comment.
+STREAM_POLL_SECONDS = 1.0
+STREAM_COALESCE_SECONDS = 0.2
+STREAM_MAX_DELAY_SECONDS = 1.0
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+class ChangeNotifier:
+    """Wakes up open /schedule/stream connections when this process writes to tasks."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Block until notify() is called after `generation` was read, or until timeout."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation
+
+change_notifier = ChangeNotifier()
+
+# Set by begin_shutdown(): /health reports draining and open event streams finish
+shutting_down = threading.Event()
+
+def begin_shutdown():
+    """Called by serve.py before draining in-flight requests."""
+    shutting_down.set()
+    change_notifier.notify()
+
+@app.after_request
+def notify_schedule_streams(response):
+    if (request.method in ("POST", "PUT", "DELETE") and response.status_code < 400
+            and request.endpoint not in ("predict_schedule", "start_training")):
+        change_notifier.notify()
+    return response
+
+def read_schedule_version():
+    with tasks_pool.connection() as conn:
+        return get_schedule_version(conn.cursor())
+
+@app.route("/schedule/stream", methods=["GET"])
+def stream_changes():
+    """Server-sent event stream announcing schedule changes.
+
+    Each event carries only the latest change sequence number; clients then fetch
+    GET /schedule/changes?since=... . Writes arriving close together are coalesced into one
+    event. Resumes from Last-Event-ID (or ?since=) after a reconnect.
+    """
+    resume_from = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        last_sent = int(resume_from) if resume_from else read_schedule_version()
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+
+    def events():
+        nonlocal last_sent
+        generation = change_notifier.generation
+        last_write = time.monotonic()
+        yield "retry: 3000\n\n"
+        # Ends when the server starts shutting down; the client reconnects to its replacement
+        while not shutting_down.is_set():
+            seq = read_schedule_version()
+            if seq != last_sent:
+                # Let the burst finish: wait while the version keeps moving, up to a limit
+                deadline = time.monotonic() + STREAM_MAX_DELAY_SECONDS
+                while time.monotonic() < deadline:
+                    generation = change_notifier.wait(generation, STREAM_COALESCE_SECONDS)
+                    latest = read_schedule_version()
+                    if latest == seq:
+                        break
+                    seq = latest
+                last_sent = seq
+                last_write = time.monotonic()
+                yield f"id: {seq}\nevent: changes\ndata: {json.dumps({'seq': seq})}\n\n"
+            elif time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                last_write = time.monotonic()
+                yield ": keep-alive\n\n"
+            generation = change_notifier.wait(generation, STREAM_POLL_SECONDS)
+
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 @app.route("/schedule", methods=["POST"])
 def add_task():
@@ -56,11 +459,18 @@ def add_task():
 
     if not name or not time:
         return jsonify({"error": "Name and time are required"}), 400
+    minutes = parse_time_to_minutes(time)
+    if minutes is None:
+        return jsonify({"error": TIME_ERROR}), 400
+    # Without a date the task goes on today, where the UI used to show every task
+    task_date = parse_task_date(data["date"]) if data.get("date") else today()
+    if task_date is None:
+        return jsonify({"error": DATE_ERROR}), 400
 
-    with sqlite3.connect("tasks.db") as conn:
+    with tasks_pool.connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO tasks (name, time, color) VALUES (?, ?, ?)", (name, time, color))
-        conn.commit()
+        cursor.execute("INSERT INTO tasks (name, time, minutes, date, color) VALUES (?, ?, ?, ?, ?)",
+                       (name, time, minutes, task_date, color))
 
     return jsonify({"message": "Task added"}), 201
 
@@ -70,11 +480,16 @@ def edit_task(task_id):
     name = data.get("name")
     time = data.get("time")
     color = data.get("color")
+    task_date = data.get("date")
 
-    if not name and not time and not color:
+    if not name and not time and not color and not task_date:
         return jsonify({"error": "Provide at least one field to update"}), 400
+    if time and parse_time_to_minutes(time) is None:
+        return jsonify({"error": TIME_ERROR}), 400
+    if task_date and parse_task_date(task_date) is None:
+        return jsonify({"error": DATE_ERROR}), 400
 
-    with sqlite3.connect("tasks.db") as conn:
+    with tasks_pool.connection() as conn:
         cursor = conn.cursor()
         updates = []
         values = []
@@ -83,55 +498,266 @@ def edit_task(task_id):
             updates.append("name=?")
             values.append(name)
         if time:
-            updates.append("time=?")
-            values.append(time)
+            updates.append("time=?, minutes=?")
+            values.extend([time, parse_time_to_minutes(time)])
         if color:
             updates.append("color=?")
             values.append(color)
+        if task_date:
+            updates.append("date=?")
+            values.append(parse_task_date(task_date))
 
         values.append(task_id)
         query = f"UPDATE tasks SET {', '.join(updates)} WHERE id=?"
         cursor.execute(query, values)
-        conn.commit()
 
     return jsonify({"message": "Task updated"}), 200
 
 @app.route("/schedule/<int:task_id>", methods=["DELETE"])
 def delete_task(task_id):
-    """Deletes a task, resets task IDs, and adds the task to the training data database."""
-    conn = sqlite3.connect("tasks.db")
-    cursor = conn.cursor()
-
-    # Retrieve the task data before deleting it
-    cursor.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-    task = cursor.fetchone()
+    """Deletes a task and adds it to the training data database. Other task IDs are left untouched."""
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
 
-    if task is None:
-        conn.close()
-        return jsonify({"error": "Task not found"}), 404
+        # Retrieve the task data before deleting it
+        cursor.execute("SELECT id, name, time, color, minutes FROM tasks WHERE id=?", (task_id,))
+        task = cursor.fetchone()
 
-    # Add the task to the training data database (without the ID to avoid conflicts)
-    with sqlite3.connect("trainingData.db") as training_conn:
-        training_cursor = training_conn.cursor()
-        # Insert the task into the training database without the `id`
-        training_cursor.execute("INSERT INTO tasks (name, time, color) VALUES (?, ?, ?)",
-                                (task[1], task[2], task[3]))
-        training_conn.commit()
+        if task is None:
+            return jsonify({"error": "Task not found"}), 404
 
-    # Now delete the task from tasks.db
-    cursor.execute("DELETE FROM tasks WHERE id=?", (task_id,))
-    conn.commit()
+        # Add the task to the training data database (without the ID to avoid conflicts)
+        with training_pool.connection() as training_conn:
+            record_training_rows(training_conn.cursor(), [task[1:]])
 
-    # Reset task IDs (optional step)
-    reset_task_ids()
+        # Now delete the task from tasks.db
+        cursor.execute("DELETE FROM tasks WHERE id=?", (task_id,))
 
-    conn.close()
+    training_jobs.request_retrain()
     print(f"✅ Task {task_id} deleted and added to training data.")
     return jsonify({"message": f"Task {task_id} deleted and added to training data."}), 200
 
-def reset_task_ids():
-    """Reorders task IDs sequentially (1,2,3...) and resets sqlite_sequence."""
-    conn = sqlite3.connect("tasks.db")
+def validate_batch_item(item, for_update=False):
+    """Returns an error message for one element of a batch request, or None if it is valid."""
+    if not isinstance(item, dict):
+        return "Each item must be an object"
+    if for_update:
+        if not isinstance(item.get("id"), int):
+            return "id is required"
+        if not item.get("name") and not item.get("time") and not item.get("color") and not item.get("date"):
+            return "Provide at least one field to update"
+    elif not item.get("name") or not item.get("time"):
+        return "Name and time are required"
+    if item.get("time") and parse_time_to_minutes(item["time"]) is None:
+        return TIME_ERROR
+    if item.get("date") and parse_task_date(item["date"]) is None:
+        return DATE_ERROR
+    return None
+
+def batch_error_response(errors):
+    """400 response listing every invalid item, so the client can fix them all in one go."""
+    results = [{"index": index, "error": error} for index, error in errors]
+    return jsonify({"error": "Invalid batch, nothing was applied", "results": results}), 400
+
+def find_duplicate_ids(ids):
+    seen = set()
+    errors = []
+    for index, task_id in enumerate(ids):
+        if task_id in seen:
+            errors.append((index, f"Duplicate id {task_id}"))
+        seen.add(task_id)
+    return errors
+
+def fetch_tasks_by_ids(cursor, ids):
+    """Looks up many tasks with one query by passing the ids as a single JSON parameter."""
+    cursor.execute("SELECT id, name, time, color, minutes FROM tasks WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps(ids),))
+    return {row[0]: row for row in cursor.fetchall()}
+
+@app.route("/schedule/batch", methods=["POST"])
+def add_tasks_batch():
+    """Adds an array of tasks in a single transaction."""
+    items = request.json
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON array of tasks"}), 400
+
+    errors = [(index, error) for index, item in enumerate(items)
+              if (error := validate_batch_item(item)) is not None]
+    if errors:
+        return batch_error_response(errors)
+
+    rows = [(item["name"], item["time"], parse_time_to_minutes(item["time"]),
+             parse_task_date(item["date"]) if item.get("date") else today(), item.get("color", "#ffffff"))
+            for item in items]
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO tasks (name, time, minutes, date, color) VALUES (?, ?, ?, ?, ?)", rows)
+        # The transaction holds the write lock, so the new ids are the last len(rows) values of the sequence
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name='tasks'")
+        last_id = cursor.fetchone()[0] if rows else 0
+
+    first_id = last_id - len(rows) + 1
+    results = [{"index": index, "id": first_id + index, "status": "created"} for index in range(len(rows))]
+    return jsonify({"results": results}), 201
+
+@app.route("/schedule/batch", methods=["PUT"])
+def edit_tasks_batch():
+    """Updates an array of tasks ({"id": ..., plus any of name/time/date/color}) in a single transaction."""
+    items = request.json
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON array of tasks"}), 400
+
+    errors = [(index, error) for index, item in enumerate(items)
+              if (error := validate_batch_item(item, for_update=True)) is not None]
+    if not errors:
+        errors = find_duplicate_ids([item["id"] for item in items])
+    if errors:
+        return batch_error_response(errors)
+
+    ids = [item["id"] for item in items]
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
+        existing = fetch_tasks_by_ids(cursor, ids)
+        # COALESCE keeps the current value for fields an item leaves out, so every row can share one statement
+        rows = [(item.get("name") or None, item.get("time") or None, parse_time_to_minutes(item.get("time")),
+                 parse_task_date(item.get("date")), item.get("color") or None, item["id"])
+                for item in items if item["id"] in existing]
+        cursor.executemany("UPDATE tasks SET name=COALESCE(?, name), time=COALESCE(?, time), "
+                           "minutes=COALESCE(?, minutes), date=COALESCE(?, date), color=COALESCE(?, color) "
+                           "WHERE id=?", rows)
+
+    results = [{"index": index, "id": task_id, "status": "updated" if task_id in existing else "not_found"}
+               for index, task_id in enumerate(ids)]
+    return jsonify({"results": results}), 200
+
+@app.route("/schedule/color", methods=["PUT"])
+def set_color_by_name():
+    """Sets the color of every task with a name ({"name": ..., "color": ...}), in every week."""
+    data = request.json
+    if not isinstance(data, dict) or not data.get("name") or not data.get("color"):
+        return jsonify({"error": "Name and color are required"}), 400
+
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
+        # Rows that already have the color are left alone, so they don't show up in the change feed
+        cursor.execute("UPDATE tasks SET color=? WHERE name=? AND color IS NOT ?",
+                       (data["color"], data["name"], data["color"]))
+        updated = cursor.rowcount
+    return jsonify({"message": "Color updated", "updated": updated}), 200
+
+@app.route("/schedule/batch", methods=["DELETE"])
+def delete_tasks_batch():
+    """Deletes an array of task ids, archiving them to the training data in one transaction per database."""
+    ids = request.json
+    if not isinstance(ids, list):
+        return jsonify({"error": "Expected a JSON array of task ids"}), 400
+
+    errors = [(index, "id must be an integer") for index, task_id in enumerate(ids) if not isinstance(task_id, int)]
+    if not errors:
+        errors = find_duplicate_ids(ids)
+    if errors:
+        return batch_error_response(errors)
+
+    with tasks_pool.connection() as conn:
+        cursor = conn.cursor()
+        existing = fetch_tasks_by_ids(cursor, ids)
+        found = [task_id for task_id in ids if task_id in existing]
+
+        with training_pool.connection() as training_conn:
+            record_training_rows(training_conn.cursor(), [existing[task_id][1:] for task_id in found])
+
+        cursor.executemany("DELETE FROM tasks WHERE id=?", [(task_id,) for task_id in found])
+
+    results = [{"index": index, "id": task_id, "status": "deleted" if task_id in existing else "not_found"}
+               for index, task_id in enumerate(ids)]
+    if found:
+        training_jobs.request_retrain()
+    print(f"✅ {len(found)} tasks deleted and added to training data.")
+    return jsonify({"results": results}), 200
+
+# Concurrent /schedule/predict requests share one model.predict call (see PredictionBatcher)
+prediction_batcher = PredictionBatcher(ai_scheduler.predict_times)
+MAX_PREDICT_TASKS = 1000
+
+@app.route("/schedule/predict", methods=["POST"])
+def predict_schedule():
+    """Predict a time for each task name with the resident model.
+
+    Body: {"tasks": ["Terra", "Gaming"], "save": false}. Names the model has never seen are
+    returned under "unknown" instead of failing the request. With "save": true the
+    predictions are also stored as a new run in predicted_schedule.db.
+    """
+    data = request.get_json(silent=True) or {}
+    task_names = data.get("tasks")
+    if (not isinstance(task_names, list) or not task_names
+            or not all(isinstance(name, str) and name for name in task_names)):
+        return jsonify({"error": "tasks must be a non-empty list of task names"}), 400
+    if len(task_names) > MAX_PREDICT_TASKS:
+        return jsonify({"error": f"At most {MAX_PREDICT_TASKS} tasks per request"}), 400
+
+    try:
+        known = ai_scheduler.known_task_names()
+    except FileNotFoundError:
+        return jsonify({"error": "No trained model yet"}), 503
+    names = [name for name in task_names if name in known]
+    unknown = sorted(set(task_names) - known)
+
+    times = prediction_batcher.predict(names) if names else []
+    result = {"predictions": [{"name": name, "time": time} for name, time in zip(names, times)],
+              "unknown": unknown}
+    if data.get("save") and names:
+        meta = ai_scheduler.load_model_meta() or {}
+        result["run_id"] = ai_scheduler.save_prediction_run(names, times, meta.get("version"))
+    return jsonify(result), 200
+
+# Deletes add training data; retrain once they stop for RETRAIN_DEBOUNCE_SECONDS (0 disables),
+# or at the latest RETRAIN_MAX_DELAY_SECONDS after the first one
+RETRAIN_DEBOUNCE_SECONDS = float(os.environ.get("RETRAIN_DEBOUNCE_SECONDS", "30"))
+RETRAIN_MAX_DELAY_SECONDS = float(os.environ.get("RETRAIN_MAX_DELAY_SECONDS", "300"))
+# serve.py sets this for gunicorn's workers
+BACKEND_WORKERS = int(os.environ.get("BACKEND_WORKERS", "1"))
+
+def training_data_revision():
+    with training_pool.connection() as conn:
+        return conn.execute("SELECT revision FROM training_revision").fetchone()[0]
+
+if BACKEND_WORKERS > 1:
+    # One worker runs the automatic retrains for all of them, see TrainingJobManager
+    training_jobs = TrainingJobManager(RETRAIN_DEBOUNCE_SECONDS, RETRAIN_MAX_DELAY_SECONDS,
+                                       owner_lock_path=f"{TRAINING_DB}.retrain.lock",
+                                       data_revision=training_data_revision)
+else:
+    training_jobs = TrainingJobManager(RETRAIN_DEBOUNCE_SECONDS, RETRAIN_MAX_DELAY_SECONDS)
+
+@app.route("/model/train", methods=["POST"])
+def start_training():
+    """Start training in the background.
+
+    Body (optional): {"full": true} to rebuild from scratch, or {"select": true} to
+    cross-validate the candidate models first, within "budget_seconds" (default
+    MODEL_SELECTION_BUDGET_SECONDS), and train the best one.
+    """
+    data = request.get_json(silent=True) or {}
+    select_budget = None
+    if data.get("select"):
+        select_budget = data.get("budget_seconds", ai_scheduler.MODEL_SELECTION_BUDGET_SECONDS)
+        if isinstance(select_budget, bool) or not isinstance(select_budget, (int, float)) or select_budget <= 0:
+            return jsonify({"error": "budget_seconds must be a positive number"}), 400
+    if not training_jobs.start(full=bool(data.get("full")), select_budget=select_budget):
+        return jsonify({"error": "A training job is already running", "job": training_jobs.status()}), 409
+    return jsonify({"job": training_jobs.status()}), 202
+
+@app.route("/model/status", methods=["GET"])
+def model_status():
+    """Progress of the current (or last) training job and the metadata of the model on disk."""
+    return jsonify({"job": training_jobs.status(), "model": ai_scheduler.load_model_meta()})
+
+def reset_task_ids(conn):
+    """Reorders task IDs sequentially (1,2,3...) and resets sqlite_sequence.
+
+    No longer run on delete: it rewrites every row and invalidates IDs clients have cached.
+    Kept as an offline maintenance step for compacting IDs.
+    """
     cursor = conn.cursor()
 
     cursor.execute("SELECT id FROM tasks ORDER BY id")
@@ -140,11 +766,9 @@ def reset_task_ids():
     for index, (old_id,) in enumerate(tasks, start=1):
         cursor.execute("UPDATE tasks SET id = ? WHERE id = ?", (index, old_id))
 
-    conn.commit()
     cursor.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
-    conn.commit()
-    conn.close()
     print("✅ Task IDs and sqlite_sequence reset successfully.")
 
 if __name__ == "__main__":
+    # Development server with the reloader; run serve.py for production
     app.run(debug=True, host="127.0.0.1", port=5000)
@@ -0,0 +1,830 @@
+"""Benchmarks for the planner backend.
+
+Run from the project folder, e.g.
+
+    python benchmark.py pool --requests 2000 --threads 4
+    python benchmark.py predict --requests 2000 --threads 16
+
+    python benchmark.py load --target server --tasks 5000 --threads 8
+    python benchmark.py suite --output before.json
+
+Every benchmark works on throwaway databases in a temp folder, seeded from a fixed
+random seed (--seed), and prints its results as JSON; --output also writes them to a
+file so two runs can be compared.
+"""
+import argparse
+import http.client
+import importlib
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TASK_NAMES = ["Terra", "Gaming", "Gym", "Reading", "Work", "Lunch", "Study", "Walk"]
+
+
+def random_time(rng):
+    """A random time in the same 'H:MM AM' format the UI sends"""
+    hour = rng.randint(1, 12)
+    minute = rng.choice([0, 15, 30, 45])
+    return f"{hour}:{minute:02d} {rng.choice(['AM', 'PM'])}"
+
+
+def load_backend(workdir):
+    """Import backend.py against fresh databases inside workdir"""
+    os.environ["TASKS_DB"] = os.path.join(workdir, "tasks.db")
+    os.environ["TRAINING_DB"] = os.path.join(workdir, "trainingData.db")
+    # Deletes would otherwise start background training processes mid-benchmark
+    os.environ["RETRAIN_DEBOUNCE_SECONDS"] = "0"
+    if "backend" in sys.modules:
+        return importlib.reload(sys.modules["backend"])
+    return importlib.import_module("backend")
+
+
+def seed_tasks(backend, count, seed=0, days=1):
+    """Insert count random tasks, dated over the days up to and including today"""
+    rng = random.Random(seed)
+    today = datetime.now().date()
+    rows = []
+    for _ in range(count):
+        time_str = random_time(rng)
+        task_date = (today - timedelta(days=rng.randrange(days))).isoformat()
+        rows.append((rng.choice(TASK_NAMES), time_str, backend.parse_time_to_minutes(time_str), task_date,
+                     "#ffffff"))
+    with backend.tasks_pool.connection() as conn:
+        conn.executemany("INSERT INTO tasks (name, time, minutes, date, color) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def seed_training_data(backend, rows, seed=0):
+    """Fill trainingData.db with synthetic_training_frame rows, as if they had been deleted tasks"""
+    df = synthetic_training_frame(rows, seed)
+    df["minutes"] = df["time"].map(backend.parse_time_to_minutes)
+    with backend.training_pool.connection() as conn:
+        backend.record_training_rows(conn.cursor(), list(df[["name", "time", "color", "minutes"]]
+                                                         .itertuples(index=False, name=None)))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latency_summary(latencies):
+    """p50/p95/p99/max in milliseconds for a list of durations in seconds"""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {}
+    return {"p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2)}
+
+
+class UnpooledConnections:
+    """Same interface as ConnectionPool, but connects per request like the original routes did"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+def run_mixed_workload(app, total_requests, threads, seed=0):
+    """Drive GET/POST/PUT requests through the Flask test client and return requests/sec"""
+    per_thread = total_requests // threads
+    errors = []
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        client = app.test_client()
+        for _ in range(per_thread):
+            roll = rng.random()
+            if roll < 0.6:
+                response = client.get("/schedule")
+            elif roll < 0.85:
+                response = client.post("/schedule", json={"name": rng.choice(TASK_NAMES), "time": random_time(rng)})
+            else:
+                response = client.put(f"/schedule/{rng.randint(1, 50)}", json={"time": random_time(rng)})
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done = per_thread * threads
+    return {"requests": done, "seconds": round(elapsed, 4), "requests_per_sec": round(done / elapsed, 1),
+            "errors": len(errors)}
+
+
+def bench_pool(args):
+    """Requests/sec with a connection per request (before) vs the WAL connection pool (after)"""
+    results = {}
+    for mode in ("per_request_connect", "pooled_wal"):
+        with tempfile.TemporaryDirectory() as workdir:
+            backend = load_backend(workdir)
+            seed_tasks(backend, args.tasks)
+            if mode == "per_request_connect":
+                # The original routes used the default rollback journal
+                backend.tasks_pool.close()
+                backend.training_pool.close()
+                for path in (backend.TASKS_DB, backend.TRAINING_DB):
+                    with sqlite3.connect(path) as conn:
+                        conn.execute("PRAGMA journal_mode=DELETE")
+                backend.tasks_pool = UnpooledConnections(backend.TASKS_DB)
+                backend.training_pool = UnpooledConnections(backend.TRAINING_DB)
+            results[mode] = run_mixed_workload(backend.app, args.requests, args.threads)
+            backend.tasks_pool.close()
+            backend.training_pool.close()
+
+    before = results["per_request_connect"]["requests_per_sec"]
+    after = results["pooled_wal"]["requests_per_sec"]
+    results["speedup"] = round(after / before, 2) if before else None
+    results["config"] = {"requests": args.requests, "threads": args.threads, "tasks": args.tasks,
+                         "pool_size": int(os.environ.get("DB_POOL_SIZE", "8"))}
+    return results
+
+
+def bench_batch(args):
+    """POST/PUT/DELETE /schedule/batch with args.tasks items each, compared to one request per task"""
+    rng = random.Random(0)
+    tasks = [{"name": rng.choice(TASK_NAMES), "time": random_time(rng)} for _ in range(args.tasks)]
+    results = {"items": len(tasks)}
+    with tempfile.TemporaryDirectory() as workdir:
+        backend = load_backend(workdir)
+        client = backend.app.test_client()
+
+        start = time.perf_counter()
+        response = client.post("/schedule/batch", json=tasks)
+        results["batch_insert_seconds"] = round(time.perf_counter() - start, 4)
+        ids = [item["id"] for item in response.json["results"]]
+
+        start = time.perf_counter()
+        client.put("/schedule/batch", json=[{"id": task_id, "color": "#ff0000"} for task_id in ids])
+        results["batch_update_seconds"] = round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        # The route prints a summary, which would end up in the JSON report
+        quietly(client.delete, "/schedule/batch", json=ids)
+        results["batch_delete_seconds"] = round(time.perf_counter() - start, 4)
+
+        # One request per task, as the frontend does today (sampled to keep the run short)
+        sample = tasks[:min(len(tasks), 500)]
+        start = time.perf_counter()
+        for task in sample:
+            client.post("/schedule", json=task)
+        elapsed = time.perf_counter() - start
+        results["single_insert_seconds_extrapolated"] = round(elapsed * len(tasks) / len(sample), 4)
+
+        backend.tasks_pool.close()
+        backend.training_pool.close()
+    return results
+
+
+@contextmanager
+def in_workdir():
+    """Run inside a temp folder so model/prediction files land there"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(cwd)
+
+
+def synthetic_training_frame(rows, seed=0):
+    """Training rows shaped like trainingData.db, each task name clustered around its own hour"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    base_hour = {name: 7 + 2 * index for index, name in enumerate(TASK_NAMES)}
+    # Every spelling the UI accepts: "7:00 PM", "07:00PM", ...
+    formats = ["{h}:{m:02d} {s}", "{h:02d}:{m:02d}{s}", "{h}:{m:02d}{s}"]
+    names, times = [], []
+    for _ in range(rows):
+        name = rng.choice(TASK_NAMES)
+        hour = min(23, max(0, int(rng.gauss(base_hour[name], 1))))
+        names.append(name)
+        times.append(rng.choice(formats).format(h=hour % 12 or 12, m=rng.choice([0, 15, 30, 45]),
+                                                s="AM" if hour < 12 else "PM"))
+    return pd.DataFrame({"id": range(1, rows + 1), "name": names, "time": times, "color": "#ffffff"})
+
+
+def quietly(func, *args, **kwargs):
+    """Call func with its progress prints sent to stderr, keeping stdout clean for the JSON report"""
+    from contextlib import redirect_stdout
+    with redirect_stdout(sys.stderr):
+        return func(*args, **kwargs)
+
+
+def bench_model(args):
+    """Cold vs warm generate_schedule() latency with the in-process model registry"""
+    import ai_scheduler
+
+    results = {"training_rows": args.rows}
+    with in_workdir():
+        quietly(ai_scheduler.train_model, synthetic_training_frame(args.rows))
+        results["model_bytes"] = os.path.getsize(ai_scheduler.model_registry.paths()[0])
+        names = TASK_NAMES[:2]
+
+        ai_scheduler.model_registry.invalidate()
+        start = time.perf_counter()
+        quietly(ai_scheduler.generate_schedule, names)
+        results["cold_seconds"] = round(time.perf_counter() - start, 4)
+
+        warm = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            quietly(ai_scheduler.generate_schedule, names)
+            warm.append(time.perf_counter() - start)
+        warm.sort()
+        results["warm_median_seconds"] = round(warm[len(warm) // 2], 4)
+
+        for mmap in (False, True):
+            registry = ai_scheduler.ModelRegistry(mmap=mmap)
+            start = time.perf_counter()
+            registry.get()
+            results[f"load_seconds_{'mmap' if mmap else 'copy'}"] = round(time.perf_counter() - start, 4)
+    return results
+
+
+def bench_estimators(args):
+    """Size, load time, predict latency and accuracy of every MODEL_ESTIMATORS kind on the same data"""
+    import numpy as np
+    import ai_scheduler
+
+    df = synthetic_training_frame(args.rows, args.seed)
+    # Every fifth row is held out; accuracy is the mean error predicting its time from its name
+    held_out = df.iloc[::5]
+    held_out_minutes = ai_scheduler.parse_times(held_out["time"]).to_numpy()
+    batch = [TASK_NAMES[index % len(TASK_NAMES)] for index in range(args.tasks)]
+    results = {"config": {"training_rows": len(df) - len(held_out), "held_out_rows": len(held_out),
+                          "predict_batch": len(batch), "repeat": args.repeat}}
+
+    configured = ai_scheduler.model_registry
+    with in_workdir():
+        try:
+            for kind, estimator in ai_scheduler.MODEL_ESTIMATORS.items():
+                ai_scheduler.model_registry = ai_scheduler.ModelRegistry(estimator)
+                start = time.perf_counter()
+                quietly(ai_scheduler.train_model, df.drop(held_out.index))
+                result = {"train_seconds": round(time.perf_counter() - start, 4),
+                          "model_bytes": os.path.getsize(ai_scheduler.model_registry.paths()[0])}
+                for mmap in (False, True):
+                    registry = ai_scheduler.ModelRegistry(estimator, mmap=mmap)
+                    start = time.perf_counter()
+                    registry.get()
+                    result[f"load_seconds_{'mmap' if mmap else 'copy'}"] = round(time.perf_counter() - start, 5)
+
+                model, le_task = ai_scheduler.model_registry.get()
+                result["predict_one"] = time_runs(
+                    lambda: ai_scheduler.predict_minutes(model, le_task, batch[:1]), args.repeat)
+                result["predict_batch"] = time_runs(
+                    lambda: ai_scheduler.predict_minutes(model, le_task, batch), args.repeat)
+                predicted = ai_scheduler.predict_minutes(model, le_task, held_out["name"])
+                result["mean_abs_error_minutes"] = round(float(np.nanmean(np.abs(predicted - held_out_minutes))), 1)
+                results[kind] = result
+        finally:
+            ai_scheduler.model_registry = configured
+    return results
+
+
+def bench_pdf(args):
+    """render_schedule_pdf() for one week and a year of weeks of --tasks tasks"""
+    import pdf_export
+    from time_utils import week_start
+
+    rng = random.Random(args.seed)
+    today = datetime.now().date()
+    first_week = week_start(today)
+    # --tasks tasks spread over each week's days, as GET /schedule?week=... would return them
+    weeks = {}
+    for index in range(52):
+        monday = first_week + timedelta(weeks=index)
+        weeks[monday] = [{"id": task_id, "name": rng.choice(TASK_NAMES), "minutes": rng.randrange(24 * 60),
+                          "date": (monday + timedelta(days=rng.randrange(7))).isoformat()}
+                         for task_id in range(1, args.tasks + 1)]
+    results = {"config": {"tasks": args.tasks}}
+    with in_workdir():
+        for week_count in (1, 52):
+            mondays = list(weeks)[:week_count]
+            results[f"weeks_{week_count}"] = time_runs(
+                lambda: pdf_export.render_schedule_pdf("schedule.pdf", mondays, weeks.get, today),
+                min(args.repeat, 5))
+            results[f"weeks_{week_count}"]["pdf_bytes"] = os.path.getsize("schedule.pdf")
+    return results
+
+
+def bench_week(args):
+    """GET /schedule?week=... (the frontend's weekly load) vs the whole schedule, as history grows
+
+    Each run stores --tasks tasks per week for a number of years, ending today.
+    """
+    from time_utils import format_week
+
+    week = format_week(datetime.now().date())
+    results = {"config": {"tasks_per_week": args.tasks, "repeat": args.repeat}}
+    for years in (1, 3, 10):
+        with tempfile.TemporaryDirectory() as workdir:
+            backend = load_backend(workdir)
+            seed_tasks(backend, args.tasks * 52 * years, args.seed, days=364 * years)
+            client = backend.app.test_client()
+            result = {"tasks": args.tasks * 52 * years,
+                      "week_tasks": len(client.get(f"/schedule?week={week}").json)}
+            result["get_week"] = time_runs(lambda: client.get(f"/schedule?week={week}"), args.repeat)
+            result["get_all"] = time_runs(lambda: client.get("/schedule"), min(args.repeat, 5))
+            results[f"years_{years}"] = result
+            backend.tasks_pool.close()
+            backend.training_pool.close()
+    return results
+
+
+def bench_parse(args):
+    """Vectorized parse_times/format_times against the per-row strptime/list-comprehension path"""
+    import pandas as pd
+    from datetime import datetime
+    import ai_scheduler
+
+    df = synthetic_training_frame(args.rows)
+    # The old path only understood "7:00PM"; give it input it can parse
+    legacy_times = df["time"].str.replace(" ", "", regex=False)
+    results = {"rows": args.rows}
+
+    start = time.perf_counter()
+    minutes = ai_scheduler.parse_times(df["time"])
+    results["vectorized_parse_seconds"] = round(time.perf_counter() - start, 4)
+    results["invalid_rows"] = int(minutes.isna().sum())
+
+    start = time.perf_counter()
+    ai_scheduler.format_times(minutes.to_numpy())
+    results["vectorized_format_seconds"] = round(time.perf_counter() - start, 4)
+
+    # The legacy path is slow; time it on a sample and scale up
+    sample = min(args.rows, 100_000)
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pd.to_datetime(legacy_times[:sample], errors="coerce").dt.hour
+    legacy_times[:sample].apply(lambda t: datetime.strptime(t, "%I:%M%p"))
+    elapsed = time.perf_counter() - start
+    results["legacy_parse_seconds_extrapolated"] = round(elapsed * args.rows / sample, 4)
+
+    values = minutes.to_numpy()[:sample]
+    start = time.perf_counter()
+    [ai_scheduler.convert_minutes_to_time(value) for value in values]
+    elapsed = time.perf_counter() - start
+    results["legacy_format_seconds_extrapolated"] = round(elapsed * args.rows / sample, 4)
+    results["legacy_sample_rows"] = sample
+    return results
+
+
+class UnbatchedPredictions:
+    """Same interface as PredictionBatcher, but one model.predict call per request"""
+
+    def __init__(self, predict_fn):
+        self.predict_fn = predict_fn
+
+    def predict(self, task_names, timeout=None):
+        return self.predict_fn(task_names)
+
+
+def bench_predict(args):
+    """Load test of POST /schedule/predict: one model.predict per request vs the micro-batcher"""
+    import ai_scheduler
+
+    per_thread = args.requests // args.threads
+    results = {"config": {"requests": per_thread * args.threads, "threads": args.threads,
+                          "training_rows": args.rows}}
+    with in_workdir() as workdir:
+        quietly(ai_scheduler.train_model, synthetic_training_frame(args.rows))
+        backend = load_backend(workdir)
+        for mode in ("per_request", "batched"):
+            if mode == "per_request":
+                backend.prediction_batcher = UnbatchedPredictions(ai_scheduler.predict_times)
+            else:
+                backend.prediction_batcher = backend.PredictionBatcher(ai_scheduler.predict_times)
+            latencies = []
+            errors = []
+
+            def worker(worker_id):
+                rng = random.Random(worker_id)
+                client = backend.app.test_client()
+                for _ in range(per_thread):
+                    names = rng.sample(TASK_NAMES, 2)
+                    start = time.perf_counter()
+                    response = client.post("/schedule/predict", json={"tasks": names})
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+            start = time.perf_counter()
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - start
+
+            results[mode] = {"seconds": round(elapsed, 4),
+                             "requests_per_sec": round(len(latencies) / elapsed, 1),
+                             **latency_summary(latencies),
+                             "errors": len(errors)}
+            if mode == "batched":
+                batcher = backend.prediction_batcher
+                results[mode]["predict_calls"] = batcher.batches
+                results[mode]["requests_per_predict_call"] = round(batcher.requests / max(batcher.batches, 1), 1)
+        backend.tasks_pool.close()
+        backend.training_pool.close()
+
+    before = results["per_request"]["requests_per_sec"]
+    results["speedup"] = round(results["batched"]["requests_per_sec"] / before, 2) if before else None
+    return results
+
+
+# Share of each request type in the load benchmark, overridable with --mix
+DEFAULT_MIX = {"get": 60, "post": 20, "put": 15, "delete": 5}
+
+
+def parse_mix(text):
+    """'get=60,post=20,...' -> {'get': 60, 'post': 20, ...}"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown request type {kind!r}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def next_request(rng, mix, max_id):
+    """Pick (route, method, path, json body) for one request of the mixed workload"""
+    kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+    if kind == "get":
+        return "GET /schedule", "GET", "/schedule", None
+    if kind == "post":
+        return "POST /schedule", "POST", "/schedule", {"name": rng.choice(TASK_NAMES), "time": random_time(rng)}
+    task_id = rng.randint(1, max_id)
+    if kind == "put":
+        return "PUT /schedule/<id>", "PUT", f"/schedule/{task_id}", {"time": random_time(rng)}
+    return "DELETE /schedule/<id>", "DELETE", f"/schedule/{task_id}", None
+
+
+class TestClientTarget:
+    """Sends requests in-process through Flask's test client"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+        return lambda method, path, body: client.open(path, method=method, json=body).status_code
+
+
+class ServerTarget:
+    """Runs the backend as a separate process on a free local port and talks HTTP to it"""
+
+    def __init__(self, workdir):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+        code = ("import sys, backend; "
+                "backend.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)")
+        self.process = subprocess.Popen([sys.executable, "-c", code, str(self.port)], cwd=workdir, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._wait_until_ready()
+
+    def _wait_until_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Backend exited with code {self.process.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                conn.request("GET", "/schedule?limit=1")
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("Backend did not start listening")
+
+    def session(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+
+        def send(method, path, body):
+            headers = {}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        return send
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_load(target, total_requests, threads, mix, max_id, seed=0):
+    """Drive the mixed workload through target and summarise throughput and latency per route"""
+    per_thread = total_requests // threads
+    samples = []  # (route, status, seconds); list.append is thread-safe
+
+    def worker(worker_id):
+        rng = random.Random(seed * 1000 + worker_id)
+        send = target.session()
+        for _ in range(per_thread):
+            route, method, path, body = next_request(rng, mix, max_id)
+            start = time.perf_counter()
+            try:
+                status = send(method, path, body)
+            except OSError:
+                status = 0  # connection error
+            samples.append((route, status, time.perf_counter() - start))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    routes = {}
+    for route in sorted({route for route, _, _ in samples}):
+        route_samples = [(status, seconds) for name, status, seconds in samples if name == route]
+        statuses = {}
+        for status, _ in route_samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        routes[route] = {"requests": len(route_samples),
+                         "requests_per_sec": round(len(route_samples) / elapsed, 1),
+                         **latency_summary([seconds for _, seconds in route_samples]),
+                         "status_counts": statuses}
+    return {"requests": len(samples), "seconds": round(elapsed, 4),
+            "requests_per_sec": round(len(samples) / elapsed, 1),
+            **latency_summary([seconds for _, _, seconds in samples]),
+            "errors": sum(1 for _, status, _ in samples if status == 0 or status >= 500),
+            "routes": routes}
+
+
+def bench_load(args):
+    """Mixed GET/POST/PUT/DELETE load against seeded databases, per-route throughput and latency"""
+    targets = ["test_client", "server"] if args.target == "both" else [args.target]
+    results = {"config": {"requests": args.requests, "threads": args.threads, "tasks": args.tasks,
+                          "training_rows": args.rows, "mix": args.mix, "seed": args.seed}}
+    for target_name in targets:
+        with tempfile.TemporaryDirectory() as workdir:
+            backend = load_backend(workdir)
+            seed_tasks(backend, args.tasks, args.seed)
+            seed_training_data(backend, args.rows, args.seed)
+            if target_name == "test_client":
+                target = TestClientTarget(backend.app)
+            else:
+                # The server process opens the databases itself
+                backend.tasks_pool.close()
+                backend.training_pool.close()
+                target = ServerTarget(workdir)
+            try:
+                results[target_name] = quietly(run_load, target, args.requests, args.threads, args.mix,
+                                               max(args.tasks, 1), args.seed)
+            finally:
+                if target_name == "server":
+                    target.close()
+                backend.tasks_pool.close()
+                backend.training_pool.close()
+    return results
+
+
+def time_runs(func, repeat, setup=None):
+    """Median/min/max of func() over repeat runs, calling setup() untimed before each"""
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return {"runs": repeat, "median_ms": round(durations[len(durations) // 2] * 1000, 2),
+            "min_ms": round(durations[0] * 1000, 2), "max_ms": round(durations[-1] * 1000, 2)}
+
+
+def bench_micro(args):
+    """reset_task_ids, load_task_counts, train_model and generate_schedule timed on their own"""
+    import ai_scheduler
+
+    results = {"config": {"tasks": args.tasks, "training_rows": args.rows, "repeat": args.repeat}}
+    with in_workdir() as workdir:
+        ai_scheduler.PREDICTIONS_DB = os.path.join(workdir, "predicted_schedule.db")
+        backend = load_backend(workdir)
+
+        def make_gaps():
+            # Half the ids deleted, the state reset_task_ids compacts
+            with backend.tasks_pool.connection() as conn:
+                conn.execute("DELETE FROM tasks")
+            seed_tasks(backend, args.tasks * 2, args.seed)
+            with backend.tasks_pool.connection() as conn:
+                conn.execute("DELETE FROM tasks WHERE id % 2 = 0")
+
+        def reset():
+            with backend.tasks_pool.connection() as conn:
+                quietly(backend.reset_task_ids, conn)
+
+        results["reset_task_ids"] = time_runs(reset, min(args.repeat, 5), setup=make_gaps)
+
+        seed_training_data(backend, args.rows, args.seed)
+
+        def drop_feature_cache():
+            if os.path.exists(ai_scheduler.FEATURE_CACHE_PATH):
+                os.remove(ai_scheduler.FEATURE_CACHE_PATH)
+
+        results["load_task_counts_uncached"] = time_runs(ai_scheduler.load_task_counts, args.repeat,
+                                                         setup=drop_feature_cache)
+        results["load_task_counts_cached"] = time_runs(ai_scheduler.load_task_counts, args.repeat)
+        backend.tasks_pool.close()
+        backend.training_pool.close()
+
+        df = synthetic_training_frame(args.rows, args.seed)
+        results["train_model"] = time_runs(lambda: quietly(ai_scheduler.train_model, df.copy()),
+                                           min(args.repeat, 3))
+        ai_scheduler.model_registry.invalidate()
+        results["generate_schedule"] = time_runs(lambda: quietly(ai_scheduler.generate_schedule, TASK_NAMES),
+                                                 args.repeat)
+    return results
+
+
+def bench_suite(args):
+    """The load test against both targets plus the micro-benchmarks"""
+    args.target = "both"
+    return {"load": bench_load(args), "micro": bench_micro(args)}
+
+
+# Started as a child process by bench_startup: prints seconds from argv[1] (the parent's
+# time.time() just before launching it) until the main window's first paint event
+FIRST_PAINT_SCRIPT = """
+import sys, time
+start = float(sys.argv[1])
+for module in sys.argv[3:]:
+    __import__(module)
+import frontend
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print(time.time() - start, flush=True)
+            QApplication.instance().exit()
+        return False
+
+frontend.API_URL = sys.argv[2]
+app = QApplication(sys.argv[:1])
+window = frontend.ScheduleApp()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+"""
+
+# What frontend.py imported at module level before the heavy imports were deferred
+EAGER_IMPORTS = ["ai_scheduler", "reportlab.lib.pagesizes", "reportlab.pdfgen.canvas"]
+
+
+def import_times(statement, env):
+    """Run statement under -X importtime; returns {module: (self_us, cumulative_us)}"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def bench_startup(args):
+    """Import-time report for frontend.py and time-to-first-paint with eager vs deferred imports"""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+               PYTHONPATH=PROJECT_DIR)
+    results = {}
+
+    times = import_times("import frontend", env)
+    top = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:15]
+    results["frontend_import_ms"] = round(times["frontend"][1] / 1000, 1)
+    results["slowest_imports_self_ms"] = {name: round(self_us / 1000, 1) for name, (self_us, _) in top}
+    deferred = import_times("; ".join(f"import {module}" for module in EAGER_IMPORTS), env)
+    results["deferred_imports_ms"] = {module: round(deferred[module][1] / 1000, 1)
+                                      for module in EAGER_IMPORTS if module in deferred}
+
+    runs = min(args.repeat, 5)
+    with tempfile.TemporaryDirectory() as workdir:
+        backend = load_backend(workdir)
+        seed_tasks(backend, args.tasks, args.seed)
+        backend.tasks_pool.close()
+        backend.training_pool.close()
+        server = ServerTarget(workdir)
+        api_url = f"http://127.0.0.1:{server.port}/schedule"
+        try:
+            modes = (("eager", EAGER_IMPORTS), ("reportlab_only", EAGER_IMPORTS[1:]), ("deferred", []))
+            for mode, modules in modes:
+                durations = []
+                for _ in range(runs):
+                    output = subprocess.run([sys.executable, "-c", FIRST_PAINT_SCRIPT, str(time.time()), api_url,
+                                             *modules], env=env, cwd=workdir, capture_output=True, text=True,
+                                            timeout=120, check=True).stdout
+                    durations.append(float(output.split()[0]))
+                durations.sort()
+                results[f"first_paint_{mode}_ms"] = round(durations[len(durations) // 2] * 1000, 1)
+        finally:
+            server.close()
+    results["first_paint_runs"] = runs
+    return results
+
+
+def run_metadata():
+    """Where and when the results were taken, to tell runs apart when comparing them"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+BENCHMARKS = {
+    "batch": bench_batch,
+    "estimators": bench_estimators,
+    "load": bench_load,
+    "micro": bench_micro,
+    "model": bench_model,
+    "parse": bench_parse,
+    "pdf": bench_pdf,
+    "predict": bench_predict,
+    "startup": bench_startup,
+    "suite": bench_suite,
+    "pool": bench_pool,
+    "week": bench_week,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Daily Planner benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=200, help="rows seeded into tasks.db")
+    parser.add_argument("--rows", type=int, default=5000, help="synthetic training rows")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["test_client", "server", "both"], default="test_client",
+                        help="where the load benchmark sends its requests")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="request mix for the load benchmark, e.g. get=60,post=20,put=15,delete=5")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = BENCHMARKS[args.benchmark](args)
+    report = json.dumps({"benchmark": args.benchmark, "meta": run_metadata(), "results": results}, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+
+import metrics
+
+# Number of connections kept open per database file
+DEFAULT_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+
+# Pragmas applied to every new connection:
+#  - WAL lets readers keep reading while a writer commits
+#  - synchronous=NORMAL is durable across app crashes in WAL mode and avoids an fsync per commit
+#  - a negative cache_size is in KiB, so every connection keeps ~8 MB of pages hot
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+QUERY_SECONDS = metrics.histogram("sqlite_query_duration_seconds",
+                                  "Time spent in execute()/executemany() on pooled connections",
+                                  ("db", "statement"))
+CONNECTIONS_OPENED = metrics.counter("sqlite_connections_opened_total", "SQLite connections opened by pools",
+                                     ("db",))
+POOL_CONNECTIONS = metrics.gauge("sqlite_pool_connections", "Open pooled connections by state",
+                                 ("db", "state"))
+_pools = weakref.WeakSet()
+
+
+def _pool_connection_counts():
+    for pool in list(_pools):
+        idle = pool._idle.qsize()
+        yield {"db": pool.db_label, "state": "idle"}, idle
+        yield {"db": pool.db_label, "state": "in_use"}, max(pool._created - idle, 0)
+
+
+POOL_CONNECTIONS.set_function(_pool_connection_counts)
+
+
+@lru_cache(maxsize=512)
+def statement_kind(sql):
+    """'SELECT', 'INSERT', ... for the metrics label; the pool only runs a fixed set of SQL strings"""
+    words = sql.lstrip(" \n\t(").split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Records how long each execute()/executemany() takes in QUERY_SECONDS.
+
+    For SELECTs that covers compiling the statement and stepping to the first row;
+    fetching the remaining rows isn't included.
+    """
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, db=self.connection.db_label,
+                                  statement=statement_kind(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, db=self.connection.db_label,
+                                  statement=statement_kind(sql))
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors, including the ones behind conn.execute(), are TimedCursors"""
+
+    db_label = "unknown"
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """A fixed-size pool of long-lived SQLite connections for one database file."""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, cached_statements=128):
+        self.path = path
+        self.db_label = os.path.basename(path)
+        self.size = max(1, int(size))
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        _pools.add(self)
+
+    def _connect(self):
+        # check_same_thread=False: a connection may be handed to a different
+        # Flask worker thread the next time it is checked out of the pool.
+        # cached_statements keeps the compiled form of our fixed SQL strings around.
+        conn = sqlite3.connect(self.path, check_same_thread=False,
+                               cached_statements=self.cached_statements, factory=TimedConnection)
+        conn.db_label = self.db_label
+        CONNECTIONS_OPENED.inc(db=self.db_label)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool exhausted: wait for another request to hand one back
+        return self._idle.get()
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commits on success and rolls back if the block raises."""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close every idle connection. Connections still checked out are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
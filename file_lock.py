@@ -0,0 +1,62 @@
+"""An exclusive lock shared between processes, held on a lock file.
+
+Uses flock() on POSIX and msvcrt.locking() on Windows. The lock goes away with the
+process holding it, so a crashed holder never leaves it stuck.
+"""
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# How often a blocking acquire() retries while another process holds the lock
+RETRY_SECONDS = 0.05
+
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """Take the lock, waiting for it unless blocking is False; returns whether it was taken"""
+        f = open(self.path, "a+b")
+        while True:
+            try:
+                if os.name == "nt":
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                if not blocking:
+                    f.close()
+                    return False
+                time.sleep(RETRY_SECONDS)
+                continue
+            self._file = f
+            return True
+
+    def release(self):
+        f, self._file = self._file, None
+        try:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
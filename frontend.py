@@ -1,21 +1,23 @@
+import bisect
+import importlib
+import json
+import os
 import re
-import sqlite3
 import sys
 import datetime
-from ai_scheduler import generate_schedule
+import threading
+import urllib.parse
+import urllib.request
 
-
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.pdfgen import canvas
-
-import requests
+from api_client import ApiClient
+from time_utils import format_week, week_start
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
-    QLineEdit, QFormLayout, QHBoxLayout, QListWidget, QMessageBox, QCalendarWidget, QTableWidget, QSizePolicy,
-    QHeaderView, QTableWidgetItem, QFileDialog, QColorDialog
+    QLineEdit, QFormLayout, QHBoxLayout, QListWidget, QListWidgetItem, QMessageBox, QCalendarWidget, QTableWidget, QSizePolicy,
+    QHeaderView, QTableWidgetItem, QFileDialog, QColorDialog, QInputDialog, QProgressDialog, QDateEdit
 )
 from PyQt6.QtGui import QFont, QColor, QPalette, QBrush
-from PyQt6.QtCore import Qt, QCoreApplication
+from PyQt6.QtCore import Qt, QCoreApplication, QTimer, QDate
 
 import logging
 
@@ -29,7 +31,20 @@ logging.basicConfig(
     ]
 )
 
-API_URL = "http://127.0.0.1:5000/schedule"
+# app.py sets API_URL to match the port it started the backend on
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:5000/schedule")
+# Modules only needed for "Save to PDF" (pdf_export pulls in reportlab); imported on first use
+# instead of before the window shows, and pre-warmed in the background shortly after it does
+# (PREWARM_IMPORTS=0 disables)
+DEFERRED_IMPORTS = ("pdf_export",)
+PREWARM_DELAY_MS = 500
+# Most weeks one "Save to PDF" can export
+MAX_EXPORT_WEEKS = 520
+# Wait this long after a pushed change before refreshing, so bursts cause a single repaint
+REFRESH_DEBOUNCE_MS = 100
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Weeks kept in memory on either side of the one on screen, so flipping back and forth is instant
+WEEK_CACHE_RADIUS = 4
 
 
 class ScheduleApp(QWidget):
@@ -37,6 +52,17 @@ class ScheduleApp(QWidget):
         super().__init__()
 
         self.selected_item = None  # Variable to hold the selected table item
+        self.api = ApiClient(API_URL, parent=self)  # Non-blocking requests to the backend
+        self.week = week_start(datetime.date.today())  # Monday of the week on screen
+        self.week_cache = {}  # Monday -> (tasks, etag, change seq) of other weeks, see show_week()
+        self.schedule = []  # Tasks of the week on screen, in id order
+        self.schedule_ids = []  # Ids of self.schedule, for bisecting
+        self.schedule_etag = None  # ETag of self.schedule, sent back as If-None-Match
+        self.change_seq = None  # Server change sequence number self.schedule is up to date with
+        self.cell_tasks = {}  # (row, column) -> ids of the tasks placed in that table cell
+        self.task_cells = {}  # Task id -> (row, column)
+        self.task_colors = {}  # Task name -> color, rebuilt from each fetched schedule
+        self.pdf_export = None  # PdfExportJob while a PDF is being written
 
         self.setWindowTitle("🗓️ AI Daily Planner")
         self.setGeometry(200, 200, 900, 600)
@@ -46,8 +72,8 @@ class ScheduleApp(QWidget):
         left_layout = QVBoxLayout()
         right_layout = QVBoxLayout()
 
-        # Today's Schedule
-        self.title_label = QLabel("📅 Today's Schedule")
+        # The week's tasks
+        self.title_label = QLabel("📅 Week's Tasks")
         self.title_label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
         self.title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         left_layout.addWidget(self.title_label)
@@ -61,8 +87,12 @@ class ScheduleApp(QWidget):
         form_layout = QFormLayout()
         self.task_name_input = QLineEdit()
         self.task_time_input = QLineEdit()
+        self.task_date_input = QDateEdit(QDate.currentDate())
+        self.task_date_input.setCalendarPopup(True)
+        self.task_date_input.setDisplayFormat("ddd d MMM yyyy")
         form_layout.addRow("📝 Task Name:", self.task_name_input)
         form_layout.addRow("⏰ Task Time:", self.task_time_input)
+        form_layout.addRow("📆 Task Date:", self.task_date_input)
         left_layout.addLayout(form_layout)
 
         button_layout = QHBoxLayout()
@@ -76,18 +106,26 @@ class ScheduleApp(QWidget):
 
         self.layout.addLayout(left_layout, 1)
 
-        # Weekly Schedule
+        # Weekly Schedule, with buttons to move between weeks
+        week_nav_layout = QHBoxLayout()
+        self.prev_week_button = QPushButton("◀")
+        self.prev_week_button.clicked.connect(lambda: self.show_week(self.week - datetime.timedelta(weeks=1)))
+        self.this_week_button = QPushButton("This Week")
+        self.this_week_button.clicked.connect(lambda: self.show_week(week_start(datetime.date.today())))
+        self.next_week_button = QPushButton("▶")
+        self.next_week_button.clicked.connect(lambda: self.show_week(self.week + datetime.timedelta(weeks=1)))
         self.weekly_label = QLabel("📅 Weekly Schedule")
         self.weekly_label.setFont(QFont("Arial", 14, QFont.Weight.Bold))
         self.weekly_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        right_layout.addWidget(self.weekly_label)
+        week_nav_layout.addWidget(self.prev_week_button)
+        week_nav_layout.addWidget(self.weekly_label, 1)
+        week_nav_layout.addWidget(self.this_week_button)
+        week_nav_layout.addWidget(self.next_week_button)
+        right_layout.addLayout(week_nav_layout)
 
         self.schedule_table = QTableWidget()
         self.schedule_table.setColumnCount(7)
         self.schedule_table.setRowCount(24)
-        self.schedule_table.setHorizontalHeaderLabels([
-            "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
-        ])
         self.schedule_table.setVerticalHeaderLabels([f"{hour}:00" for hour in range(24)])
         # Create a QTableWidgetIt
 
@@ -128,8 +166,8 @@ class ScheduleApp(QWidget):
         # Create the "Refresh Schedule" button
         self.refresh_button = QPushButton("🔄 Refresh Schedule")
 
-        # Connect the refresh button to the update_table method
-        self.refresh_button.clicked.connect(self.update_table)
+        # Connect the refresh button to the fetch_schedule method
+        self.refresh_button.clicked.connect(self.fetch_schedule)
 
         # Add buttons to the horizontal layout
         self.hBox_edit_colour_refresh.addWidget(self.editColour_button)
@@ -145,8 +183,20 @@ class ScheduleApp(QWidget):
         self.delete_button.clicked.connect(self.delete_task)
 
         self.setLayout(self.layout)
-        self.update_table()
+        self.update_week_labels()
         self.fetch_schedule()
+        self.prefetch_adjacent_weeks()
+
+        # Refresh when the server pushes a change. The single-shot timer restarts on every
+        # event, so a burst of events ends in one fetch and one repaint.
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DEBOUNCE_MS)
+        self.refresh_timer.timeout.connect(self.fetch_schedule)
+        self.schedule_stream = self.api.stream("/stream")
+        self.schedule_stream.event_received.connect(self.on_server_event)
+        self.schedule_stream.connected.connect(self.on_stream_connected)
+        self.schedule_stream.open()
 
     def load_styles(self):
         return """
@@ -191,22 +241,233 @@ class ScheduleApp(QWidget):
         """
 
     def fetch_schedule(self):
-        self.task_list.clear()
-        try:
-            response = requests.get(API_URL)
-            if response.status_code == 200:
-                self.schedule = response.json()
-                for task in self.schedule:
-                    self.task_list.addItem(f"{task['id']}. {task['time']} - {task['name']}")
+        """Bring the list and table up to date with the server.
+
+        The first call loads the week on screen; later calls only ask for what changed since
+        then and patch the affected list rows and table cells. A newer refresh cancels one
+        that is still in flight.
+        """
+        if self.change_seq is None:
+            self.load_full_schedule()
+            return
+        reply = self.api.get("/changes", params={"since": self.change_seq}, key="schedule")
+        reply.finished.connect(self.on_changes_loaded)
+        reply.failed.connect(lambda error: QMessageBox.critical(
+            self, "Network Error", f"Failed to connect to server!\n{error}"))
+
+    def on_server_event(self, event, data):
+        if event == "changes":
+            self.refresh_timer.start()
+
+    def on_stream_connected(self):
+        # Catch up on anything missed while the stream was down (the first load is already underway)
+        if self.change_seq is not None:
+            self.refresh_timer.start()
+
+    def load_full_schedule(self):
+        # Send the last ETag so an unchanged schedule comes back as a bodyless 304
+        headers = {"If-None-Match": self.schedule_etag} if self.schedule_etag else {}
+        reply = self.api.get(params={"week": format_week(self.week)}, headers=headers, key="schedule")
+        reply.finished.connect(self.on_schedule_loaded)
+        reply.failed.connect(lambda error: QMessageBox.critical(
+            self, "Network Error", f"Failed to connect to server!\n{error}"))
+
+    def on_schedule_loaded(self, response):
+        if response.status == 200:
+            self.set_schedule(self.week_tasks(response.data), response.headers.get("etag"),
+                              int(response.headers.get("x-change-seq", 0)))
+        elif response.status != 304:
+            QMessageBox.warning(self, "Error", "Failed to load schedule from the server!")
+
+    def week_tasks(self, tasks):
+        """A week as the server sends it (by date and time) in the id order self.schedule is kept in."""
+        tasks = sorted(tasks, key=lambda task: task['id'])
+        for ordinal, task in enumerate(tasks, start=1):
+            task['ordinal'] = ordinal
+        return tasks
+
+    def set_schedule(self, tasks, etag, change_seq):
+        """Show a whole week's tasks in the list and table."""
+        self.schedule = tasks
+        self.schedule_ids = [task['id'] for task in self.schedule]
+        self.schedule_etag = etag
+        self.change_seq = change_seq
+        self.task_colors = {}
+        for task in self.schedule:
+            # Tasks sharing a name share a color; the first one wins, as the old SQL lookup did
+            self.task_colors.setdefault(task['name'], task['color'])
+        self.update_task_list(self.schedule)
+        self.update_table(self.schedule)
+
+    def show_week(self, monday):
+        """Switch the table and list to the week starting monday.
+
+        The week being left is kept in self.week_cache. A cached week is shown at once and
+        then caught up through the change feed like any refresh; any other week is loaded.
+        """
+        if monday == self.week:
+            return
+        if self.change_seq is not None:
+            self.week_cache[self.week] = (self.schedule, self.schedule_etag, self.change_seq)
+        self.week = monday
+        self.update_week_labels()
+        cached = self.week_cache.pop(monday, None)
+        if cached is not None:
+            self.set_schedule(*cached)
+        else:
+            # The ETag belongs to the week being left, so don't send it for this one
+            self.set_schedule([], None, None)
+        self.fetch_schedule()
+        self.prefetch_adjacent_weeks()
+
+    def prefetch_adjacent_weeks(self):
+        """Load the weeks either side of the one on screen in the background, and forget far ones."""
+        self.week_cache = {monday: week for monday, week in self.week_cache.items()
+                           if abs((monday - self.week).days) <= 7 * WEEK_CACHE_RADIUS}
+        for monday in (self.week - datetime.timedelta(weeks=1), self.week + datetime.timedelta(weeks=1)):
+            if monday in self.week_cache:
+                continue
+            reply = self.api.get(params={"week": format_week(monday)}, key=f"prefetch {monday}")
+            reply.finished.connect(lambda response, monday=monday: self.on_week_prefetched(monday, response))
+            reply.failed.connect(lambda error: logging.warning(f"Could not prefetch a week: {error}"))
+
+    def on_week_prefetched(self, monday, response):
+        # The user may have moved to that week already, in which case its full load is underway
+        if response.status != 200 or monday == self.week:
+            return
+        self.week_cache[monday] = (self.week_tasks(response.data), response.headers.get("etag"),
+                                   int(response.headers.get("x-change-seq", 0)))
+
+    def update_week_labels(self):
+        sunday = self.week + datetime.timedelta(days=6)
+        self.weekly_label.setText(f"📅 {self.week:%d %b} - {sunday:%d %b %Y}")
+        self.schedule_table.setHorizontalHeaderLabels([
+            f"{day}\n{self.week + datetime.timedelta(days=index):%d %b}" for index, day in enumerate(DAYS)
+        ])
+
+    def task_day(self, task):
+        """The date a task is on; tasks without one (from an older backend) go on today, as they used to."""
+        if task.get('date'):
+            return datetime.date.fromisoformat(task['date'])
+        return datetime.date.today()
+
+    def in_shown_week(self, task):
+        return self.week <= self.task_day(task) < self.week + datetime.timedelta(weeks=1)
 
+    def on_changes_loaded(self, response):
+        if response.status == 410:
+            # Too far behind the server's change log, start over
+            self.change_seq = None
+            self.load_full_schedule()
+            return
+        if response.status != 200:
+            QMessageBox.warning(self, "Error", "Failed to load schedule from the server!")
+            return
+        self.apply_changes(response.data["changes"])
+        self.change_seq = response.data["seq"]
+
+    def apply_changes(self, changes):
+        """Patch self.schedule, the task list and only the table cells touched by these changes."""
+        touched_cells = set()
+        touched_names = set()
+        first_index = len(self.schedule)  # list rows from here on may need a new ordinal
+
+        for change in changes:
+            task_id = change['id']
+            index = bisect.bisect_left(self.schedule_ids, task_id)
+            exists = index < len(self.schedule_ids) and self.schedule_ids[index] == task_id
+            if exists:
+                touched_names.add(self.schedule[index]['name'])
+                touched_cells.add(self.unplace_task(task_id))
+
+            # A task moved to another week leaves this one just like a deleted task
+            if change['op'] == 'delete' or not self.in_shown_week(change['task']):
+                if exists:
+                    del self.schedule[index]
+                    del self.schedule_ids[index]
+                    self.task_list.takeItem(index)
+            else:
+                task = change['task']
+                task['ordinal'] = index + 1  # corrected by the renumbering below if rows shifted
+                touched_names.add(task['name'])
+                if exists:
+                    self.schedule[index] = task
+                else:
+                    self.schedule.insert(index, task)
+                    self.schedule_ids.insert(index, task_id)
+                    self.task_list.insertItem(index, self.make_list_item(task))
+                touched_cells.add(self.place_task(task))
+            first_index = min(first_index, index)
+
+        # Renumber the list from the first change down, rewriting only labels that differ
+        for index in range(first_index, len(self.schedule)):
+            task = self.schedule[index]
+            task['ordinal'] = index + 1
+            item = self.task_list.item(index)
+            label = self.list_label(task)
+            if item.text() != label:
+                item.setText(label)
+
+        # A name's color comes from its first task, so other cells showing it may need repainting
+        recolored = set()
+        for name in touched_names:
+            color = next((task['color'] for task in self.schedule if task['name'] == name), None)
+            if self.task_colors.get(name) != color:
+                recolored.add(name)
+            if color is None:
+                self.task_colors.pop(name, None)
             else:
-                QMessageBox.warning(self, "Error", "Failed to load schedule from the server!")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Network Error", f"Failed to connect to server!\n{str(e)}")
+                self.task_colors[name] = color
+        if recolored:
+            touched_cells.update(cell for cell, task_ids in self.cell_tasks.items()
+                                 if task_ids and self.task_by_id(max(task_ids))['name'] in recolored)
+
+        touched_cells.discard(None)
+        self.schedule_table.blockSignals(True)
+        for cell in touched_cells:
+            self.paint_cell(cell)
+        self.schedule_table.blockSignals(False)
+
+    def task_by_id(self, task_id):
+        index = bisect.bisect_left(self.schedule_ids, task_id)
+        if index < len(self.schedule_ids) and self.schedule_ids[index] == task_id:
+            return self.schedule[index]
+        return None
+
+    def list_label(self, task):
+        return f"{task['ordinal']}. {self.task_day(task):%a} {task['time']} - {task['name']}"
+
+    def make_list_item(self, task):
+        # Show the display ordinal but keep the stable task ID on the item
+        item = QListWidgetItem(self.list_label(task))
+        item.setData(Qt.ItemDataRole.UserRole, task['id'])
+        return item
+
+    def update_task_list(self, tasks):
+        self.task_list.clear()
+        for task in tasks:
+            self.task_list.addItem(self.make_list_item(task))
+
+    def send_change(self, method, path, payload, expected_status, error_message, on_success=None):
+        """Send a write request and refresh the schedule once it succeeds."""
+        reply = self.api.request(method, path, json_body=payload)
+
+        def finished(response):
+            if response.status != expected_status:
+                QMessageBox.warning(self, "Error", error_message)
+                return
+            if on_success:
+                on_success()
+            self.fetch_schedule()
+
+        reply.finished.connect(finished)
+        reply.failed.connect(lambda error: QMessageBox.critical(
+            self, "Network Error", f"Could not send request!\n{error}"))
 
     def add_task(self):
         name = self.task_name_input.text().strip()
         time = self.task_time_input.text().strip()
+        day = self.task_date_input.date().toPyDate()
         time_pattern = r'^(0?[1-9]|1[0-2]):([0-5][0-9])\s*(AM|PM)$'
         if not name or not time:
             QMessageBox.warning(self, "Input Error", "Task name and time cannot be empty!")
@@ -215,17 +476,15 @@ class ScheduleApp(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter time in the format HH:MM AM/PM or H:MM AM/PM.")
             return
 
-        try:
-            response = requests.post(API_URL, json={"name": name, "time": time})
-            if response.status_code == 201:
-                print("Task added successfully!")
-                self.task_name_input.clear()
-                self.task_time_input.clear()
-                self.fetch_schedule()
-            else:
-                QMessageBox.warning(self, "Error", "Failed to add task.")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Network Error", f"Could not send request!\n{str(e)}")
+        def added():
+            print("Task added successfully!")
+            self.task_name_input.clear()
+            self.task_time_input.clear()
+            # Show the new task, wherever it landed
+            self.show_week(week_start(day))
+
+        self.send_change("POST", "", {"name": name, "time": time, "date": day.isoformat()}, 201,
+                         "Failed to add task.", added)
 
     def edit_task(self):
         selected_item = self.task_list.currentItem()
@@ -233,7 +492,7 @@ class ScheduleApp(QWidget):
             QMessageBox.warning(self, "Selection Error", "Select a task to edit!")
             return
 
-        task_id = int(selected_item.text().split(".")[0])
+        task_id = selected_item.data(Qt.ItemDataRole.UserRole)
         name = self.task_name_input.text().strip()
         time = self.task_time_input.text().strip()
         time_pattern = r'^(0?[1-9]|1[0-2]):([0-5][0-9])\s*(AM|PM)$'
@@ -245,15 +504,8 @@ class ScheduleApp(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter time in the format HH:MM AM/PM or H:MM AM/PM.")
             return
 
-        try:
-            response = requests.put(f"{API_URL}/{task_id}", json={"name": name, "time": time})
-            if response.status_code == 200:
-                logging.info("Task edited successfully!")
-                self.fetch_schedule()
-            else:
-                QMessageBox.warning(self, "Error", "Failed to update task.")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Network Error", f"Could not send request!\n{str(e)}")
+        self.send_change("PUT", f"/{task_id}", {"name": name, "time": time}, 200, "Failed to update task.",
+                         lambda: logging.info("Task edited successfully!"))
 
     def delete_task(self):
         selected_item = self.task_list.currentItem()
@@ -261,23 +513,17 @@ class ScheduleApp(QWidget):
             QMessageBox.warning(self, "Selection Error", "Select a task to delete!")
             return
 
-        task_id = int(selected_item.text().split(".")[0])
+        task_id = selected_item.data(Qt.ItemDataRole.UserRole)
 
-        try:
-            response = requests.delete(f"{API_URL}/{task_id}")
-            if response.status_code == 200:
-                logging.info("Task deleted successfully!")
-                self.fetch_schedule()
-            else:
-                QMessageBox.warning(self, "Error", "Failed to delete task.")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Network Error", f"Could not send request!\n{str(e)}")
+        self.send_change("DELETE", f"/{task_id}", None, 200, "Failed to delete task.",
+                         lambda: logging.info("Task deleted successfully!"))
 
     def select_task(self, item):
-        task_id = int(item.text().split(".")[0])
+        task_id = item.data(Qt.ItemDataRole.UserRole)
         print(f"Selected task ID: {task_id}")
 
     def closeEvent(self, event):
+        self.schedule_stream.close()
         QCoreApplication.quit()
         event.accept()
 
@@ -292,101 +538,93 @@ class ScheduleApp(QWidget):
         task_name = task_item.text().strip()
 
         if task_name:
-            try:
-                # Connect to the database (replace with your actual database path or connection details)
-                connection = sqlite3.connect('tasks.db')  # Replace with your database path
-                cursor = connection.cursor()
-
-                # SQL query to fetch the color for the task name
-                cursor.execute("SELECT color FROM tasks WHERE name = ?", (task_name,))
-                result = cursor.fetchone()
-
-                if result:
-                    task_color = result[0]  # Assuming the color is stored in the first column
-                    color = QColor(task_color)  # Convert the color (assuming it's stored in hex format)
-                    task_item.setBackground(QBrush(color))  # Set the background to the fetched color
-                else:
-                    logging.warning(f"No color found for task {task_name} at {row}, {column}")
+            task_color = self.get_task_color(task_name)
+            if task_color:
+                task_item.setBackground(QBrush(QColor(task_color)))  # Set the background to the cached color
+            else:
+                logging.warning(f"No color found for task {task_name} at {row}, {column}")
 
-                # Set the text color to black explicitly
-                task_item.setForeground(QBrush(QColor(0, 0, 0)))  # Ensure the text is black
+            # Set the text color to black explicitly
+            task_item.setForeground(QBrush(QColor(0, 0, 0)))  # Ensure the text is black
 
-                logging.info(f"Task {task_name} at {row}, {column} set to color")
-            except sqlite3.Error as e:
-                logging.error(f"Database error: {str(e)}")
-            finally:
-                connection.close()  # Always close the database connection
+            logging.info(f"Task {task_name} at {row}, {column} set to color")
 
         self.schedule_table.blockSignals(False)  # 🟢 Re-enable signals
 
-    def update_table(self):
-        try:
-            response = requests.get(API_URL)
-            if response.status_code == 200:
-                tasks = response.json()  # Get the task data from the response
-
-                # Clear any previous tasks from the table
-                for row in range(self.schedule_table.rowCount()):
-                    for col in range(self.schedule_table.columnCount()):
-                        self.schedule_table.setItem(row, col, None)  # Clear the cell
-
-                # Iterate over each task and add it to the correct time slot in the table
-                for task in tasks:
-                    task_name = task['name']
-                    task_time = task['time']
-
-                    # Convert the time string to a row (assuming the format is 'HH:MM AM/PM')
-                    row = self.get_row_from_time(task_time)
-                    if row is None:
-                        continue  # Skip tasks with invalid times
-
-                    # Find the column based on the day (you can map it to a specific column index)
-                    day_of_week = self.get_day_of_week()
-                    column = self.get_column_from_day(day_of_week)
-
-                    # Get the color for the task from the database
-                    color = self.get_task_color(task_name)
-
-                    # Create a new item and set its text (task name)
-                    item = QTableWidgetItem(task_name)
-                    item.setForeground(QBrush(QColor("black")))  # Text color black
-
-                    # Set the background color of the task item if a valid color is found
-                    if color:
-                        item.setBackground(QBrush(QColor(color)))  # Set background to the task's color
-                    else:
-                        item.setBackground(QBrush(QColor("lightblue")))  # Fallback color
-
-                    self.schedule_table.setItem(row, column, item)
-            else:
-                QMessageBox.warning(self, "Error", "Failed to load tasks from the server!")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Network Error", f"Failed to connect to server!\n{str(e)}")
+    def update_table(self, tasks):
+        # Items are colored here already, so don't let setItem() run cell_changed for each one
+        self.schedule_table.blockSignals(True)
+
+        # Clear any previous tasks from the table
+        for row in range(self.schedule_table.rowCount()):
+            for col in range(self.schedule_table.columnCount()):
+                self.schedule_table.setItem(row, col, None)  # Clear the cell
+        self.cell_tasks = {}
+        self.task_cells = {}
+
+        # Iterate over each task and add it to the correct time slot in the table
+        for task in tasks:
+            self.place_task(task)
+        for cell in self.cell_tasks:
+            self.paint_cell(cell)
+
+        self.schedule_table.blockSignals(False)
+
+    def place_task(self, task):
+        """Record which table cell a task belongs in and return that (row, column), or None."""
+        # The backend already parsed the time into minutes since midnight
+        if task.get('minutes') is not None:
+            row = task['minutes'] // 60
+        else:
+            row = self.get_row_from_time(task['time'])
+        if row is None:
+            return None  # Skip tasks with invalid times
+
+        # Find the column based on the day (you can map it to a specific column index)
+        day_of_week = self.task_day(task).weekday()
+        column = self.get_column_from_day(day_of_week)
+
+        self.cell_tasks.setdefault((row, column), set()).add(task['id'])
+        self.task_cells[task['id']] = (row, column)
+        return row, column
+
+    def unplace_task(self, task_id):
+        """Forget a task's table cell and return it, or None if it had none."""
+        cell = self.task_cells.pop(task_id, None)
+        if cell is not None:
+            self.cell_tasks[cell].discard(task_id)
+        return cell
+
+    def paint_cell(self, cell):
+        """Draw the newest task placed in a cell, or clear the cell if it has none."""
+        row, column = cell
+        task_ids = self.cell_tasks.get(cell)
+        if not task_ids:
+            self.schedule_table.setItem(row, column, None)
+            return
+        task_name = self.task_by_id(max(task_ids))['name']
+
+        # Get the color for the task from the fetched schedule
+        color = self.get_task_color(task_name)
+
+        # Create a new item and set its text (task name)
+        item = QTableWidgetItem(task_name)
+        item.setForeground(QBrush(QColor("black")))  # Text color black
+
+        # Set the background color of the task item if a valid color is found
+        if color:
+            item.setBackground(QBrush(QColor(color)))  # Set background to the task's color
+        else:
+            item.setBackground(QBrush(QColor("lightblue")))  # Fallback color
+
+        self.schedule_table.setItem(row, column, item)
 
     def get_task_color(self, task_name):
         """
-        Retrieves the color for a task from the database using its name.
+        Retrieves the color for a task from the colors of the last fetched schedule.
         Returns None if no color is found.
         """
-        try:
-            # Connect to the database
-            connection = sqlite3.connect('tasks.db')  # Replace with your database path
-            cursor = connection.cursor()
-
-            # SQL query to fetch the color for the task name
-            cursor.execute("SELECT color FROM tasks WHERE name = ?", (task_name,))
-            result = cursor.fetchone()
-
-            if result:
-                task_color = result[0]  # Assuming the color is stored in the first column
-                return task_color
-            else:
-                return None  # No color found for this task
-        except sqlite3.Error as e:
-            print(f"Database error: {str(e)}")
-            return None  # Return None if there's an error
-        finally:
-            connection.close()  # Always close the database connection
+        return self.task_colors.get(task_name)
 
     def get_row_from_time(self, time):
         """Convert a task time (HH:MM AM/PM) to a row index in the table."""
@@ -401,58 +639,57 @@ class ScheduleApp(QWidget):
             return hour  # Return the row index for the 24-hour format (0-23)
         return None  # Return None if the time format is invalid
 
-    def get_day_of_week(self):
-        """Assign a day of the week (0-6) based on the current date."""
-        # Get the current date
-        current_date = datetime.datetime.now()
-
-        # Get the day of the week (Monday=0, Tuesday=1, ..., Sunday=6)
-        return current_date.weekday()
-
     def get_column_from_day(self, day_of_week):
         """Convert the day of the week (0-6) to a column index in the table."""
         return day_of_week  # 0 = Monday, 1 = Tuesday, ..., 6 = Sunday
 
     def save_to_pdf(self):
+        """Export a range of weeks, starting with the one on screen, to a PDF on a background thread."""
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Schedule as PDF", "", "PDF Files (*.pdf)")
         if not file_path:
             return
+        week_count, ok = QInputDialog.getInt(self, "Save to PDF", "Weeks to export, starting with the one shown:",
+                                             1, 1, MAX_EXPORT_WEEKS)
+        if not ok:
+            return
 
-        try:
-            c = canvas.Canvas(file_path, pagesize=landscape(letter))
-            width, height = landscape(letter)
-
-            c.setFont("Helvetica-Bold", 18)
-            c.drawCentredString(width / 2, height - 40, "Weekly Schedule")
-
-            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            hours = [f"{h}:00" for h in range(24)]
-
-            col_width = width / (len(days) + 1)
-            row_height = (height - 80) / (len(hours) + 1)
-
-            # Draw headers
-            c.setFont("Helvetica-Bold", 10)
-            for i, day in enumerate(days):
-                c.drawString((i + 1) * col_width + 5, height - 60, day)
-            for j, hour in enumerate(hours):
-                c.drawString(5, height - 80 - (j + 1) * row_height + 5, hour)
-
-            # Draw task content
-            c.setFont("Helvetica", 8)
-            for row in range(self.schedule_table.rowCount()):
-                for col in range(self.schedule_table.columnCount()):
-                    item = self.schedule_table.item(row, col)
-                    if item:
-                        text = item.text()
-                        x = (col + 1) * col_width + 5
-                        y = height - 80 - (row + 1) * row_height + 5
-                        c.drawString(x, y, text)
-
-            c.save()
-            QMessageBox.information(self, "Success", f"Schedule saved to {file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save PDF:\n{str(e)}")
+        import pdf_export
+
+        # The week on screen is rendered from a copy of its task data, not the table widgets,
+        # so the schedule can keep updating while the worker runs; the worker fetches the rest
+        first_week = self.week
+        shown_tasks = [dict(task) for task in self.schedule]
+        mondays = [first_week + datetime.timedelta(weeks=index) for index in range(week_count)]
+
+        def load_week(monday):
+            return shown_tasks if monday == first_week else fetch_week(monday)
+
+        self.pdf_export = pdf_export.PdfExportJob(file_path, mondays, load_week, datetime.date.today(), parent=self)
+        self.pdf_progress = QProgressDialog("Saving PDF...", "Cancel", 0, week_count, self)
+        self.pdf_progress.setWindowTitle("Save to PDF")
+        self.pdf_progress.setMinimumDuration(300)  # Only shown for exports that take a while
+        self.pdf_progress.canceled.connect(self.pdf_export.cancel)
+        self.pdf_export.progress.connect(lambda done, total: self.pdf_progress.setValue(done))
+        self.pdf_export.finished.connect(self.on_pdf_saved)
+        self.pdf_export.failed.connect(self.on_pdf_failed)
+        self.pdf_export.cancelled.connect(self.finish_pdf_export)
+        self.save_pdf_button.setEnabled(False)
+        self.pdf_export.start()
+
+    def on_pdf_saved(self, file_path):
+        self.finish_pdf_export()
+        QMessageBox.information(self, "Success", f"Schedule saved to {file_path}")
+
+    def on_pdf_failed(self, error):
+        self.finish_pdf_export()
+        QMessageBox.critical(self, "Error", f"Failed to save PDF:\n{error}")
+
+    def finish_pdf_export(self):
+        self.pdf_progress.canceled.disconnect()
+        self.pdf_progress.close()
+        self.pdf_export.deleteLater()
+        self.pdf_export = None
+        self.save_pdf_button.setEnabled(True)
 
     def on_item_clicked(self, row, column):
         """This method is triggered when a table cell is clicked."""
@@ -478,39 +715,70 @@ class ScheduleApp(QWidget):
         if color.isValid():  # Check if the color is valid
             selected_color = color.name()  # Get the color in HEX format
 
-            # Optionally, update the color in the database as well
+            # Update the color on the server as well
             task_name = self.selected_item.text()
-            self.update_task_color_in_db(task_name, selected_color)
+            self.save_task_color(task_name, selected_color)
             self.selected_item.setBackground(QBrush(color))
 
             logging.info(f"Color for task '{task_name}' updated to {selected_color}")
 
-    def update_task_color_in_db(self, task_name, color):
-        """Update the task color in the database."""
-        try:
-            connection = sqlite3.connect('tasks.db')
-            cursor = connection.cursor()
+    def save_task_color(self, task_name, color):
+        """Update the color of every task with this name, in every week, on the server."""
+        self.task_colors[task_name] = color
+        self.send_change("PUT", "/color", {"name": task_name, "color": color}, 200, "Failed to update task color.")
 
-            cursor.execute("UPDATE tasks SET color = ? WHERE name = ?", (color, task_name))
-            connection.commit()
-            connection.close()
+    def run_ai_schedule(self):
+        """Ask the backend to predict a time for every task in the schedule and save the result."""
+        task_names = list(dict.fromkeys(task['name'] for task in self.schedule if task['name']))
+        if not task_names:
+            QMessageBox.warning(self, "AI Schedule", "Add some tasks to the schedule first!")
+            return
 
-        except sqlite3.Error as e:
-            print(f"Database error: {str(e)}")
+        reply = self.api.post("/predict", json_body={"tasks": task_names, "save": True}, key="predict")
+        reply.finished.connect(self.on_ai_schedule_ready)
+        reply.failed.connect(lambda error: QMessageBox.critical(
+            self, "Error", f"Failed to generate schedule:\n{error}"))
 
-    def run_ai_schedule(self):
-        # You can also pull tasks from your UI dynamically here
-        task_names = ["Terra,Gaming"]
+    def on_ai_schedule_ready(self, response):
+        if response.status != 200:
+            error = (response.data or {}).get("error", f"HTTP {response.status}")
+            QMessageBox.critical(self, "Error", f"Failed to generate schedule:\n{error}")
+            return
+
+        lines = [f"{prediction['name']}: {prediction['time']}" for prediction in response.data["predictions"]]
+        if "run_id" in response.data:
+            lines.insert(0, "AI-generated schedule saved to predicted_schedule.db\n")
+        if response.data["unknown"]:
+            lines.append(f"\nNot enough history yet for: {', '.join(response.data['unknown'])}")
+        QMessageBox.information(self, "AI Schedule", "\n".join(lines))
+
+
+def fetch_week(monday):
+    """One week's tasks, fetched with a blocking request; for worker threads, not the GUI thread."""
+    query = urllib.parse.urlencode({"week": format_week(monday), "fields": "id,name,minutes,date"})
+    with urllib.request.urlopen(f"{API_URL}?{query}", timeout=30) as response:
+        return json.load(response)
+
+
+def prewarm_imports():
+    """Import DEFERRED_IMPORTS on a background thread so the first PDF export doesn't wait for them.
+
+    Python's import lock makes a click that arrives mid-import simply wait for it to finish.
+    """
+    def run():
+        for module in DEFERRED_IMPORTS:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                logging.warning(f"Could not pre-import {module}: {e}")
 
-        try:
-            generate_schedule(task_names)
-            QMessageBox.information(self, "AI Schedule", "AI-generated schedule saved to predicted_schedule.db")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate schedule:\n{str(e)}")
+    threading.Thread(target=run, name="prewarm-imports", daemon=True).start()
 
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = ScheduleApp()
     window.show()
+    if os.environ.get("PREWARM_IMPORTS", "1") != "0":
+        QTimer.singleShot(PREWARM_DELAY_MS, prewarm_imports)
     sys.exit(app.exec())
@@ -0,0 +1,172 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+A small stand-in for prometheus_client covering what the backend needs: counters,
+gauges (set directly or computed at scrape time) and histograms, all with labels and
+safe to update from any thread.
+
+    REQUESTS = metrics.counter("http_requests_total", "HTTP requests", ("method", "status"))
+    REQUESTS.inc(method="GET", status="200")
+    text = metrics.registry.render()
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cached SQLite lookup up to a model training run
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value) for render()"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", key, (), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, key, extra)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """Compute the gauge at scrape time: function() yields (labels dict, value) pairs"""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            yield from super().samples()
+            return
+        for labels, value in self._function():
+            yield "", self._key(labels), (), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            # Buckets are upper bounds (le), the last one is +Inf
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with-block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", key, (("le", format_value(bound)),), cumulative
+            yield "_sum", key, (), total
+            yield "_count", key, (), count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add metric, or return the one already registered under its name (e.g. on module reload)"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# The registry GET /metrics renders
+registry = MetricsRegistry()
+
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
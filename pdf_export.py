@@ -0,0 +1,143 @@
+"""Weekly schedule PDF export, one page per week, rendered off the GUI thread.
+
+The page frame (day headers, hour labels and grid lines) is drawn once as a reportlab
+form and stamped onto every page, and each font is a single resource shared by all
+pages, so a long range of weeks costs little more than the task text itself.
+"""
+import datetime
+import os
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfgen import canvas
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+PAGE_SIZE = landscape(letter)
+TEMPLATE_NAME = "week-frame"
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def week_cells(tasks, monday, today):
+    """{(hour, weekday): task name} for the tasks of tasks that fall in the week starting monday.
+
+    Tasks without a date (from a backend that predates them) go in today's column, as they
+    used to. When several share a cell the newest one (highest id) is shown, as in the table.
+    """
+    cells = {}
+    sunday = monday + datetime.timedelta(days=6)
+    for task in sorted(tasks, key=lambda task: task['id']):
+        day = datetime.date.fromisoformat(task['date']) if task.get('date') else today
+        if task.get('minutes') is not None and monday <= day <= sunday:
+            cells[(task['minutes'] // 60, day.weekday())] = task['name']
+    return cells
+
+
+def draw_week_frame(c, width, height):
+    """Define the part of the page every week shares as a form, drawn with c.doForm()"""
+    col_width = width / (len(DAYS) + 1)
+    row_height = (height - 80) / 25
+    c.beginForm(TEMPLATE_NAME)
+    c.setFont("Helvetica-Bold", 10)
+    for i, day in enumerate(DAYS):
+        c.drawString((i + 1) * col_width + 5, height - 60, day)
+    for hour in range(24):
+        c.drawString(5, height - 80 - (hour + 1) * row_height + 5, f"{hour}:00")
+
+    c.setStrokeGray(0.8)
+    c.setLineWidth(0.5)
+    # Hour h's cells span height - 80 - (h + 1) * row_height up to height - 80 - h * row_height
+    top, bottom = height - 80, height - 80 - 24 * row_height
+    for i in range(len(DAYS)):
+        c.line((i + 1) * col_width, top, (i + 1) * col_width, bottom)
+    for j in range(25):
+        c.line(col_width, top - j * row_height, width, top - j * row_height)
+    c.endForm()
+
+
+def render_schedule_pdf(path, mondays, load_week, today=None, progress=None, cancel_event=None):
+    """Write one page per week in mondays to path and return the page count.
+
+    load_week(monday) returns the tasks to draw on that week's page; it runs on the
+    calling thread, so it may block (e.g. fetch the week from the backend).
+    progress(pages_done, pages_total) is called after each page. Setting cancel_event
+    stops between pages with ExportCancelled, leaving any existing file at path untouched:
+    pages are written to a temporary file that replaces path only once it is complete.
+    """
+    today = today or datetime.date.today()
+    width, height = PAGE_SIZE
+    col_width = width / (len(DAYS) + 1)
+    row_height = (height - 80) / 25
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        c = canvas.Canvas(tmp_path, pagesize=PAGE_SIZE)
+        c.setTitle("Weekly Schedule")
+        draw_week_frame(c, width, height)
+        for page, monday in enumerate(mondays, start=1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            tasks = load_week(monday)
+            sunday = monday + datetime.timedelta(days=6)
+            c.doForm(TEMPLATE_NAME)
+            c.setFont("Helvetica-Bold", 18)
+            c.drawCentredString(width / 2, height - 40,
+                                f"Weekly Schedule, {monday:%d %b} - {sunday:%d %b %Y}")
+
+            # Draw task content
+            c.setFont("Helvetica", 8)
+            for (row, col), text in week_cells(tasks, monday, today).items():
+                x = (col + 1) * col_width + 5
+                y = height - 80 - (row + 1) * row_height + 5
+                c.drawString(x, y, text)
+            c.showPage()
+            if progress is not None:
+                progress(page, len(mondays))
+        c.save()
+        os.replace(tmp_path, path)
+        return len(mondays)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class PdfExportJob(QObject):
+    """Runs render_schedule_pdf() on a background thread.
+
+    The signals are emitted from that thread; Qt queues them to the receivers' thread, so
+    slots on the window run on the GUI thread as usual. Exactly one of finished, failed and
+    cancelled fires.
+    """
+
+    progress = pyqtSignal(int, int)  # pages done, pages total
+    finished = pyqtSignal(str)  # path of the saved PDF
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, path, mondays, load_week, today=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.mondays = mondays
+        self.load_week = load_week
+        self.today = today
+        self._cancel = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="pdf-export", daemon=True).start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        try:
+            render_schedule_pdf(self.path, self.mondays, self.load_week, self.today, self.progress.emit,
+                                self._cancel)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(self.path)
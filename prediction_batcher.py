@@ -0,0 +1,83 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+# How long the batcher waits for more requests after the first one arrives, and the most
+# task names it hands to a single predict call (configurable with PREDICT_BATCH_WINDOW_MS
+# and PREDICT_MAX_BATCH)
+DEFAULT_WINDOW_SECONDS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "2")) / 1000
+DEFAULT_MAX_BATCH = int(os.environ.get("PREDICT_MAX_BATCH", "512"))
+
+BATCH_REQUESTS = metrics.histogram("prediction_batch_requests", "Requests answered by one predict call",
+                                   buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+
+class PredictionBatcher:
+    """Coalesces concurrent prediction requests into one vectorized predict call.
+
+    predict_fn takes a list of task names and returns one result per name. Request threads
+    call predict() and block; a single worker thread collects everything that arrives within
+    window_seconds of the first request (up to max_batch names), calls predict_fn once for
+    all of it and hands each caller its own slice of the results. If the combined call
+    fails, the requests in that batch are retried one by one so a bad request only fails
+    itself.
+    """
+
+    def __init__(self, predict_fn, window_seconds=DEFAULT_WINDOW_SECONDS, max_batch=DEFAULT_MAX_BATCH):
+        self.predict_fn = predict_fn
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, task_names, timeout=None):
+        """Return predict_fn(task_names), computed together with any concurrent requests"""
+        future = Future()
+        self._queue.put((list(task_names), future))
+        return future.result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.window_seconds
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.requests += len(batch)
+            BATCH_REQUESTS.observe(len(batch))
+            names = [name for task_names, _ in batch for name in task_names]
+            try:
+                results = self.predict_fn(names)
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                    continue
+                for task_names, future in batch:
+                    try:
+                        future.set_result(self.predict_fn(task_names))
+                    except Exception as single_exc:
+                        future.set_exception(single_exc)
+                continue
+
+            start = 0
+            for task_names, future in batch:
+                future.set_result(results[start:start + len(task_names)])
+                start += len(task_names)
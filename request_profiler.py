@@ -0,0 +1,83 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps a profile only for requests slower than a threshold.
+
+    While requests are in flight, a background thread snapshots their stacks every
+    interval_seconds with sys._current_frames(); the request threads themselves are never
+    traced, so the cost is one stack walk per active request per tick. When a request ends
+    after threshold_seconds or more, its samples are written to output_dir in the collapsed
+    stack format ("frame;frame;frame count" per line) that flamegraph.pl and speedscope
+    read. Only the newest max_profiles files are kept.
+    """
+
+    def __init__(self, threshold_seconds, interval_seconds=0.005, output_dir="profiles", max_profiles=50):
+        self.threshold_seconds = threshold_seconds
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.max_profiles = max_profiles
+        self._condition = threading.Condition()
+        self._active = {}  # thread id -> Counter of collapsed stacks
+        self._sampler = None
+
+    def begin(self):
+        """Start sampling the calling thread"""
+        with self._condition:
+            self._active[threading.get_ident()] = Counter()
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._sampler.start()
+            self._condition.notify()
+
+    def end(self, label, duration):
+        """Stop sampling the calling thread; returns the profile path if the request was slow"""
+        with self._condition:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks or duration < self.threshold_seconds:
+            return None
+        return self._write(label, duration, stacks)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._active)
+                thread_ids = list(self._active)
+            frames = sys._current_frames()
+            samples = [(thread_id, self._collapse(frames[thread_id])) for thread_id in thread_ids
+                       if thread_id in frames]
+            del frames
+            with self._condition:
+                for thread_id, stack in samples:
+                    # The request may have ended while its stack was being walked
+                    if thread_id in self._active:
+                        self._active[thread_id][stack] += 1
+            time.sleep(self.interval_seconds)
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _write(self, label, duration, stacks):
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{safe_label}.folded"
+        path = os.path.join(self.output_dir, name)
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        profiles = sorted(entry for entry in os.listdir(self.output_dir) if entry.endswith(".folded"))
+        for old in profiles[:-self.max_profiles]:
+            os.remove(os.path.join(self.output_dir, old))
+        return path
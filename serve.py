@@ -0,0 +1,201 @@
+"""Production launcher for the planner backend.
+
+    python serve.py                      # waitress (or gunicorn / werkzeug), 8 threads
+    python serve.py --workers 4          # gunicorn, 4 processes x 8 threads (POSIX only)
+
+Picks the best WSGI server that is installed: waitress (pip install waitress, works on
+Windows too), then gunicorn, then Werkzeug's threaded server without the debugger and
+reloader. Options also come from BACKEND_HOST, BACKEND_PORT, BACKEND_WORKERS,
+BACKEND_THREADS and BACKEND_DRAIN_SECONDS.
+
+On SIGTERM / Ctrl+C (Ctrl+Break on Windows) the server stops accepting connections,
+GET /health starts answering 503, open event streams end, and requests already in flight
+get up to --drain-timeout seconds to finish before the process exits.
+
+Each worker process keeps its own model cache, prediction batcher and training job
+manager, so with --workers > 1 GET /model/status only describes the worker that answers.
+Automatic retrains after deletes run in one worker only, for all of them.
+"""
+import argparse
+import importlib.util
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+
+class InFlightRequests:
+    """WSGI middleware counting requests whose response hasn't been fully sent yet."""
+
+    def __init__(self, app):
+        self.app = app
+        self._condition = threading.Condition()
+        self._count = 0
+
+    def __call__(self, environ, start_response):
+        with self._condition:
+            self._count += 1
+        try:
+            iterable = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        # Servers call close() once the body has been sent (or the client went away)
+        return ClosingIterator(iterable, [self._finished])
+
+    def _finished(self):
+        with self._condition:
+            self._count -= 1
+            self._condition.notify_all()
+
+    def wait_idle(self, timeout):
+        """Block until no request is in flight; returns False if timeout ran out first"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count == 0, timeout)
+
+    @property
+    def count(self):
+        return self._count
+
+
+def installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def choose_server(requested, workers):
+    if requested != "auto":
+        return requested
+    if workers > 1:
+        if os.name != "nt" and installed("gunicorn"):
+            return "gunicorn"
+        print("⚠️ --workers needs gunicorn (POSIX only); running a single process instead.")
+    if installed("waitress"):
+        return "waitress"
+    if os.name != "nt" and installed("gunicorn"):
+        return "gunicorn"
+    return "werkzeug"
+
+
+def shutdown_signals():
+    signals = [signal.SIGINT, signal.SIGTERM]
+    if hasattr(signal, "SIGBREAK"):
+        signals.append(signal.SIGBREAK)  # what Ctrl+Break / CTRL_BREAK_EVENT sends on Windows
+    return signals
+
+
+def serve_threaded(server_name, args):
+    """Run waitress or Werkzeug in a background thread and drain it on a shutdown signal"""
+    import backend
+
+    app = InFlightRequests(backend.app)
+    if server_name == "waitress":
+        import waitress
+        server = waitress.create_server(app, host=args.host, port=args.port, threads=args.threads)
+        run = server.run
+
+        def stop_accepting():
+            # Checked by waitress's event loop; connections still open keep being served
+            server.accepting = False
+
+        def stop():
+            server.task_dispatcher.shutdown(cancel_pending=True, timeout=1)
+    else:
+        from werkzeug.serving import make_server
+        server = make_server(args.host, args.port, app, threaded=True)
+        run = server.serve_forever
+        stop_accepting = server.shutdown
+        stop = server.server_close
+
+    stop_requested = threading.Event()
+    for signum in shutdown_signals():
+        signal.signal(signum, lambda *_: stop_requested.set())
+
+    thread = threading.Thread(target=run, name=f"{server_name}-server", daemon=True)
+    thread.start()
+    threads = f"{args.threads} threads" if server_name == "waitress" else "a thread per request"
+    print(f"✅ Backend serving on http://{args.host}:{args.port} with {server_name} ({threads})")
+    # Short waits so signal handlers get to run on the main thread
+    while not stop_requested.wait(0.5):
+        if not thread.is_alive():
+            return 1
+
+    print(f"Shutting down, draining {app.count} in-flight request(s)...")
+    backend.begin_shutdown()
+    stop_accepting()
+    if not app.wait_idle(args.drain_timeout):
+        print(f"⚠️ {app.count} request(s) still running after {args.drain_timeout:g}s, exiting anyway.")
+    # Give the server a moment to flush the last responses to their sockets
+    time.sleep(0.2)
+    stop()
+    return 0
+
+
+def serve_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    def post_worker_init(worker):
+        # Gunicorn drains a worker on SIGTERM by itself; also end its event streams,
+        # which would otherwise hold the worker open until graceful_timeout
+        import backend
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_term(signum, frame):
+            backend.begin_shutdown()
+            previous(signum, frame)
+        signal.signal(signal.SIGTERM, handle_term)
+
+    class PlannerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("graceful_timeout", math.ceil(args.drain_timeout))
+            # Event streams are long-lived; their keep-alives arrive every 15 s
+            self.cfg.set("timeout", 60)
+            self.cfg.set("post_worker_init", post_worker_init)
+
+        def load(self):
+            import backend
+            return backend.app
+
+    # Create/migrate the databases once up front rather than in every worker at the same time.
+    # In a separate process: workers are forked from this one and must import backend
+    # themselves (its pools and background threads don't survive a fork).
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    python_path = os.pathsep.join(filter(None, [project_dir, os.environ.get("PYTHONPATH")]))
+    subprocess.run([sys.executable, "-c", "import backend"], check=True,
+                   env=dict(os.environ, PYTHONPATH=python_path))
+    # Tells the workers (forked from this process) that they share the data with others
+    os.environ["BACKEND_WORKERS"] = str(args.workers)
+
+    PlannerApplication().run()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the planner backend with a production WSGI server")
+    parser.add_argument("--server", choices=["auto", "waitress", "gunicorn", "werkzeug"], default="auto")
+    parser.add_argument("--host", default=os.environ.get("BACKEND_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("BACKEND_PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("BACKEND_WORKERS", "1")),
+                        help="worker processes (gunicorn only)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("BACKEND_THREADS", "8")),
+                        help="request threads per worker; each open event stream holds one")
+    parser.add_argument("--drain-timeout", type=float, default=float(os.environ.get("BACKEND_DRAIN_SECONDS", "10")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    args = parser.parse_args(argv)
+
+    server_name = choose_server(args.server, args.workers)
+    if server_name == "gunicorn":
+        return serve_gunicorn(args)
+    return serve_threaded(server_name, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
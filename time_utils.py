@@ -0,0 +1,50 @@
+import datetime
+import re
+
+# Same format the UI accepts: "7:00 PM", "07:00PM", "12:30 am"
+TIME_PATTERN = re.compile(r'^(0?[1-9]|1[0-2]):([0-5][0-9])\s*(AM|PM)$', re.IGNORECASE)
+# An ISO week: "2025-W07"
+WEEK_PATTERN = re.compile(r'^(\d{4})-W(\d{2})$')
+
+
+def parse_time_to_minutes(time_str):
+    """Convert a time string (e.g. '7:00 PM') to minutes from midnight, or None if it doesn't parse"""
+    if not isinstance(time_str, str):
+        return None
+    match = TIME_PATTERN.match(time_str.strip())
+    if not match:
+        return None
+    hour = int(match.group(1)) % 12
+    if match.group(3).upper() == 'PM':
+        hour += 12
+    return hour * 60 + int(match.group(2))
+
+
+def format_minutes(minutes):
+    """Convert minutes since midnight to time in 12-hour AM/PM format"""
+    minutes = int(round(minutes)) % (24 * 60)
+    hour = minutes // 60
+    minute = minutes % 60
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def week_start(day):
+    """The Monday of the week a date falls in"""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def format_week(monday):
+    """The ISO week a date falls in, as '2025-W07'"""
+    year, week, _ = monday.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def parse_week(week_str):
+    """The Monday of an ISO week written as '2025-W07', or None if it isn't one"""
+    match = WEEK_PATTERN.match(week_str.strip()) if isinstance(week_str, str) else None
+    if not match:
+        return None
+    try:
+        return datetime.date.fromisocalendar(int(match.group(1)), int(match.group(2)), 1)
+    except ValueError:
+        return None
@@ -0,0 +1,170 @@
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from file_lock import FileLock
+
+# How often the worker running retrains for several server processes checks for new training data
+REVISION_POLL_SECONDS = 2.0
+
+
+def run_training(full, messages, select_budget=None):
+    """Entry point of the training process. Reports back through the messages queue.
+
+    With select_budget (seconds) the job cross-validates the candidate models first, see
+    ai_scheduler.select_model().
+    """
+    import ai_scheduler
+
+    def progress(phase, fraction):
+        messages.put(("progress", phase, round(fraction, 3)))
+
+    try:
+        if select_budget is not None:
+            meta = ai_scheduler.select_model(budget_seconds=select_budget, progress=progress)
+        elif full:
+            meta = ai_scheduler.train_model(ai_scheduler.load_task_counts(), progress)
+        else:
+            meta = ai_scheduler.train_model_incremental(progress)
+        messages.put(("done", meta))
+    except Exception:
+        messages.put(("failed", traceback.format_exc(limit=5)))
+
+
+class TrainingJobManager:
+    """Runs model training in a child process, one job at a time, and tracks its status.
+
+    Fitting the forest holds the GIL for seconds, so it gets its own process instead of a
+    thread in the server. The child saves each model version to a folder of its own and then
+    switches model_meta.json over to it with an atomic rename, and the server's
+    ModelRegistry picks the new version up on its next get().
+
+    request_retrain() debounces automatic retrains: each call pushes the start back by
+    debounce_seconds, but never more than max_delay_seconds after the first call of a burst.
+    A retrain requested while a job is running starts once that job has finished.
+
+    When several server processes share the data (gunicorn --workers), pass owner_lock_path
+    and data_revision, a callable returning the training data's current revision. Only the
+    process holding the lock file then runs automatic retrains, starting one whenever the
+    revision moves, whichever process recorded the data; request_retrain() does nothing in
+    the others. If that process exits, another one takes the lock over.
+    """
+
+    def __init__(self, debounce_seconds=30.0, max_delay_seconds=300.0, owner_lock_path=None, data_revision=None):
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._timer = None
+        self._burst_started = None
+        self._rerun = False
+        self._job_count = 0
+        self._status = {"state": "idle"}
+        self._owner_lock = None
+        if owner_lock_path is not None and debounce_seconds > 0:
+            self._owner_lock = FileLock(owner_lock_path)
+            threading.Thread(target=self._watch_revision, args=(data_revision,), name="retrain-owner",
+                             daemon=True).start()
+
+    def status(self):
+        with self._lock:
+            status = dict(self._status)
+            if status["state"] == "running":
+                status["elapsed_seconds"] = round(time.monotonic() - status.pop("_started"), 2)
+            status.pop("_started", None)
+            status["retrain_pending"] = self._timer is not None or self._rerun
+            if self._owner_lock is not None:
+                status["retrain_owner"] = self._owner_lock.held
+            return status
+
+    def start(self, full=False, trigger="manual", select_budget=None):
+        """Start a training job, a model selection one with select_budget. Returns False if one is already running."""
+        with self._lock:
+            if self._status["state"] == "running":
+                return False
+            self._job_count += 1
+            messages = self._context.Queue()
+            process = self._context.Process(target=run_training, args=(full, messages, select_budget),
+                                            name="model-training", daemon=True)
+            self._status = {"state": "running", "job": self._job_count, "trigger": trigger, "full": full,
+                            "select_budget_seconds": select_budget, "phase": "starting", "progress": 0.0,
+                            "started_at": datetime.now().isoformat(timespec="seconds"),
+                            "_started": time.monotonic()}
+            process.start()
+        threading.Thread(target=self._watch, args=(process, messages), name="training-watch",
+                         daemon=True).start()
+        return True
+
+    def request_retrain(self):
+        """Schedule a debounced incremental retrain (no-op when debounce_seconds <= 0)"""
+        if self.debounce_seconds <= 0 or self._owner_lock is not None:
+            return
+        self._schedule_retrain()
+
+    def _watch_revision(self, data_revision):
+        """Wait to become the retrain owner, then request a retrain whenever the data revision moves"""
+        while not self._owner_lock.acquire(blocking=False):
+            time.sleep(REVISION_POLL_SECONDS)
+        seen = None
+        while True:
+            try:
+                revision = data_revision()
+            except Exception:
+                traceback.print_exc(limit=2)
+            else:
+                # The first reading is only a baseline, whatever it holds was already there at startup
+                if seen is not None and revision != seen:
+                    self._schedule_retrain()
+                seen = revision
+            time.sleep(REVISION_POLL_SECONDS)
+
+    def _schedule_retrain(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+            else:
+                self._burst_started = now
+            delay = min(self.debounce_seconds, self._burst_started + self.max_delay_seconds - now)
+            self._timer = threading.Timer(max(delay, 0), self._debounced_start)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _debounced_start(self):
+        with self._lock:
+            self._timer = None
+        if not self.start(trigger="debounced"):
+            with self._lock:
+                self._rerun = True
+
+    def _watch(self, process, messages):
+        result = None
+        while result is None:
+            try:
+                message = messages.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    result = ("failed", f"Training process exited with code {process.exitcode}")
+                continue
+            if message[0] == "progress":
+                with self._lock:
+                    self._status.update(phase=message[1], progress=message[2])
+            else:
+                result = message
+        process.join()
+
+        with self._lock:
+            started = self._status.pop("_started")
+            self._status.update(finished_at=datetime.now().isoformat(timespec="seconds"),
+                                duration_seconds=round(time.monotonic() - started, 2))
+            if result[0] == "done":
+                self._status.update(state="succeeded", phase="done", progress=1.0,
+                                    model_version=(result[1] or {}).get("version"))
+            else:
+                self._status.update(state="failed", error=result[1])
+            rerun, self._rerun = self._rerun, False
+        if rerun:
+            self.start(trigger="debounced")
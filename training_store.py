@@ -0,0 +1,147 @@
+"""Schema and writes of the training database (trainingData.db).
+
+Training data is stored as counts per (task name, minute of day), which is all the model
+uses, so training reads O(names x minutes) rows however many tasks have been deleted.
+With TRAINING_ARCHIVE on (the default) the raw rows are also kept, zlib-compressed, in
+task_archive; nothing reads that table on the hot path. TRAINING_ARCHIVE=0 drops them.
+
+Both the backend and ai_scheduler call init_training_db(), so either can open a database
+written by an older version.
+"""
+import json
+import os
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from time_utils import parse_time_to_minutes
+
+TRAINING_ARCHIVE = os.environ.get("TRAINING_ARCHIVE", "1") != "0"
+# Archive chunks smaller than this are merged at startup (single deletes write one row each)
+ARCHIVE_CHUNK_ROWS = 1000
+
+
+def init_training_db(conn):
+    """Create the training tables on conn, migrating a database from an older version, and commit"""
+    migrated = False
+    with conn:
+        cursor = conn.cursor()
+        # Raw rows as written before the counts existed; emptied by the migration below
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                time TEXT NOT NULL,
+                color TEXT DEFAULT '#ffffff'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_time_counts (
+                name TEXT NOT NULL,
+                minutes INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (name, minutes)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("PRAGMA table_info(task_time_counts)")
+        if 'revision' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE task_time_counts ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        # Feature caches (ai_scheduler.load_task_counts) fetch the rows changed since the
+        # revision they were read at; store_id tells them apart from a recreated database
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_time_counts_revision ON task_time_counts (revision)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS training_revision (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                revision INTEGER NOT NULL,
+                store_id TEXT NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO training_revision (id, revision, store_id) VALUES (1, 0, ?)",
+                       (uuid.uuid4().hex,))
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_archive (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                archived_at TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            )
+        ''')
+
+        # user_version 1: raw rows have been folded into task_time_counts
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] < 1:
+            migrated = migrate_raw_training_rows(cursor)
+            cursor.execute("PRAGMA user_version = 1")
+        compact_training_archive(cursor)
+
+    if migrated:
+        # Give the space of the raw rows back
+        conn.isolation_level, level = None, conn.isolation_level
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.isolation_level = level
+
+
+def record_training_rows(cursor, rows):
+    """Add deleted tasks, as (name, time, color, minutes) tuples, to the training data."""
+    counts = Counter((name, minutes) for name, _, _, minutes in rows if minutes is not None)
+    if counts:
+        # Bumping the revision first takes the write lock, so concurrent writers get distinct ones
+        cursor.execute("UPDATE training_revision SET revision = revision + 1")
+        cursor.execute("SELECT revision FROM training_revision")
+        revision = cursor.fetchone()[0]
+        cursor.executemany('''
+            INSERT INTO task_time_counts (name, minutes, count, revision) VALUES (?, ?, ?, ?)
+            ON CONFLICT (name, minutes) DO UPDATE SET count = count + excluded.count, revision = excluded.revision
+        ''', [(name, minutes, count, revision) for (name, minutes), count in counts.items()])
+    if TRAINING_ARCHIVE and rows:
+        archive_training_rows(cursor, [[name, time, color] for name, time, color, _ in rows])
+
+
+def archive_training_rows(cursor, rows):
+    payload = zlib.compress(json.dumps(rows, separators=(",", ":")).encode())
+    cursor.execute("INSERT INTO task_archive (archived_at, row_count, payload) VALUES (?, ?, ?)",
+                   (datetime.now().isoformat(timespec="seconds"), len(rows), payload))
+
+
+def load_training_archive(cursor):
+    """All archived raw training rows as [name, time, color] lists, oldest first."""
+    cursor.execute("SELECT payload FROM task_archive ORDER BY id")
+    return [row for (payload,) in cursor.fetchall() for row in json.loads(zlib.decompress(payload))]
+
+
+def compact_training_archive(cursor):
+    """Merge small archive chunks into one so zlib has enough data to compress well."""
+    cursor.execute("SELECT id, payload FROM task_archive WHERE row_count < ? ORDER BY id", (ARCHIVE_CHUNK_ROWS,))
+    chunks = cursor.fetchall()
+    if len(chunks) < 2:
+        return
+    rows = [row for _, payload in chunks for row in json.loads(zlib.decompress(payload))]
+    cursor.execute("DELETE FROM task_archive WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps([chunk_id for chunk_id, _ in chunks]),))
+    archive_training_rows(cursor, rows)
+
+
+def migrate_raw_training_rows(cursor):
+    """One-off: fold the raw training rows into task_time_counts (and the archive), then drop them."""
+    cursor.execute("SELECT name, time, color FROM tasks ORDER BY id")
+    migrated = skipped = 0
+    while True:
+        chunk = cursor.fetchmany(10000)
+        if not chunk:
+            break
+        rows = [(name, time, color, parse_time_to_minutes(time)) for name, time, color in chunk]
+        skipped += sum(1 for row in rows if row[3] is None)
+        migrated += len(rows)
+        # A second cursor, the first one is still iterating over tasks
+        record_training_rows(cursor.connection.cursor(), rows)
+    if not migrated:
+        return False
+    cursor.execute("DELETE FROM tasks")
+    kept = "archived" if TRAINING_ARCHIVE else "dropped"
+    print(f"✅ Folded {migrated} raw training rows into task_time_counts ({skipped} with unparseable "
+          f"times skipped); raw rows {kept}.")
+    return True